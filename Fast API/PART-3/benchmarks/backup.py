@@ -0,0 +1,126 @@
+"""Blog write latency while blog.backup copies a large database.
+
+Run from Fast API/PART-3:
+
+    python -m benchmarks.backup --size-mb 2048 --rate 200
+
+A database with the blog schema and the production SQLite profile is padded
+to --size-mb with a filler table. A writer thread then creates one blog per
+transaction, --rate times a second, timing every commit, in three phases:
+no backup, a stepped backup (--pages per step, --pause-ms between steps),
+and a single-step backup (the whole file in one backup_step call). With
+--journal delete, writes restart the stepped backup until it gives up and
+locks them out (blog.backup.DEFAULT_MAX_RESTARTS).
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from sqlalchemy import create_engine, text
+
+BODY = "lorem ipsum " * 100
+CHUNK = 64 * 1024
+
+
+def pad(engine, size_mb: int):
+    rows_per_batch = 256  # 16 MB
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS backup_filler (data BLOB)"))
+    for _ in range(max(1, size_mb * 1024 * 1024 // (CHUNK * rows_per_batch))):
+        with engine.begin() as conn:
+            conn.execute(text(
+                "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :rows) "
+                "INSERT INTO backup_filler (data) SELECT randomblob(:chunk) FROM n"
+            ), {"rows": rows_per_batch, "chunk": CHUNK})
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+class Writer(threading.Thread):
+    """Creates blogs at a fixed rate and records each commit's latency in `latencies` (seconds)."""
+
+    def __init__(self, engine, rate: float):
+        super().__init__(daemon=True)
+        self.engine = engine
+        self.interval = 1 / rate
+        self.latencies = []
+        self.errors = 0
+        self._done = threading.Event()
+
+    def run(self):
+        next_at = time.perf_counter()
+        while not self._done.is_set():
+            started = time.perf_counter()
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(text("INSERT INTO blogs (title, body, user_id) VALUES ('bench', :body, 1)"),
+                                 {"body": BODY})
+                self.latencies.append(time.perf_counter() - started)
+            except Exception:  # "database is locked" after busy_timeout
+                self.errors += 1
+            next_at += self.interval
+            self._done.wait(max(0.0, next_at - time.perf_counter()))
+
+    def stop(self) -> list:
+        self._done.set()
+        self.join()
+        return self.latencies
+
+
+def summary(name: str, latencies: list, errors: int, extra: str = "") -> str:
+    if not latencies:
+        return f"{name:<22}{'no writes':>12}"
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return (f"{name:<22}{len(ordered):>8}{errors:>8}{statistics.median(ordered) * 1000:>10.2f}"
+            f"{p99 * 1000:>10.2f}{ordered[-1] * 1000:>10.2f}  {extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=2048, help="database size to back up")
+    parser.add_argument("--rate", type=float, default=200, help="blog writes per second")
+    parser.add_argument("--idle-seconds", type=float, default=5, help="length of the no-backup phase")
+    parser.add_argument("--pages", type=int, default=1024, help="pages per backup step")
+    parser.add_argument("--pause-ms", type=float, default=5, help="pause between backup steps")
+    parser.add_argument("--journal", choices=["wal", "delete"], default="wal", help="journal mode of the source")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "blog.db")
+        # blog.database connects at import; keep it off the working directory
+        os.environ["BLOG_DATABASE_URL"] = f"sqlite:///{path}"
+        from blog import backup, migrations, sqlite_profile
+
+        engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+        sqlite_profile.install(engine, {**sqlite_profile.PRODUCTION_PRAGMAS, "journal_mode": args.journal.upper()})
+        migrations.upgrade(engine)
+        started = time.perf_counter()
+        pad(engine, args.size_mb)
+        print(f"Padded to {os.path.getsize(path) / 1e6:.0f} MB in {time.perf_counter() - started:.0f} s "
+              f"({args.journal} journal)")
+
+        print(f"{'phase':<22}{'writes':>8}{'errors':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        writer = Writer(engine, args.rate)
+        writer.start()
+        time.sleep(args.idle_seconds)
+        print(summary("no backup", writer.stop(), writer.errors))
+
+        for name, pages, pause in (("stepped backup", args.pages, args.pause_ms / 1000), ("one-step backup", -1, 0)):
+            dest = os.path.join(tmp, f"{name.split()[0]}.db")
+            writer = Writer(engine, args.rate)
+            writer.start()
+            stats = backup.backup(path, dest, pages=pages, pause=pause)
+            latencies = writer.stop()
+            rate = stats["bytes"] / 1e6 / stats["seconds"]
+            print(summary(name, latencies, writer.errors,
+                          f"{stats['seconds']:.1f} s, {rate:.0f} MB/s, {stats['restarts']} restarts"
+                          f"{', locked' if stats['locked'] else ''}"))
+            os.remove(dest)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
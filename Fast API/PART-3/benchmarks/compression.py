@@ -0,0 +1,118 @@
+"""Database size and I/O per query, with and without blog body compression.
+
+Run from Fast API/PART-3:
+
+    python -m benchmarks.compression --blogs 20000 --queries 200
+
+The same seeded dataset is written once with plain bodies and once with
+BLOG_BODY_COMPRESS_MIN_BYTES in effect, then VACUUMed. Every query runs on a
+fresh connection with a minimal page cache and no mmap, so each page it
+touches is a read() of the file; those are counted from /proc/self/io (Linux).
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.pool import NullPool
+
+
+def queries(models) -> dict:
+    Blog = models.Blog
+    return {
+        # GET /blog/ page (needs the bodies)
+        "list page": lambda rng, ids, users: (
+            select(Blog.id, Blog.title, Blog.body).where(Blog.id > rng.choice(ids)).order_by(Blog.id).limit(100)
+        ),
+        # GET /user/{id}?summary=true (titles only)
+        "user summary": lambda rng, ids, users: (
+            select(Blog.id, Blog.title).where(Blog.user_id == rng.choice(users)).order_by(Blog.id).limit(50)
+        ),
+        # GET /blog/{id}
+        "single blog": lambda rng, ids, users: (
+            select(Blog.id, Blog.title, Blog.body).where(Blog.id == rng.choice(ids))
+        ),
+    }
+
+
+def read_bytes() -> int:
+    try:
+        with open("/proc/self/io") as io:
+            return next(int(line.split()[1]) for line in io if line.startswith("rchar:"))
+    except OSError:
+        return 0
+
+
+def measure(engine, query, ids: list, users: list, runs: int) -> tuple:
+    rng = random.Random(7)
+    pages = seconds = 0.0
+    for _ in range(runs):
+        with engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA cache_size=1")
+            conn.exec_driver_sql("PRAGMA mmap_size=0")
+            stmt = query(rng, ids, users)
+            before, started = read_bytes(), time.perf_counter()
+            conn.execute(stmt).all()
+            seconds += time.perf_counter() - started
+            pages += read_bytes() - before
+    with engine.connect() as conn:
+        page_size = conn.exec_driver_sql("PRAGMA page_size").scalar()
+    return pages / page_size / runs, seconds / runs
+
+
+def run(path: str, min_bytes: int, users: int, blogs: int, runs: int) -> dict:
+    from blog import config, migrations, models
+    from .seed import seed
+
+    config.BODY_COMPRESS_MIN_BYTES = min_bytes
+    url = f"sqlite:///{path}"
+    engine = create_engine(url)
+    migrations.upgrade(engine)
+    seed(engine, users=users, blogs=blogs)
+    with engine.connect() as conn:
+        conn.exec_driver_sql("VACUUM")
+        blog_pages = conn.execute(text("SELECT count(*) FROM dbstat WHERE name = 'blogs'")).scalar()
+        compressed = conn.execute(text("SELECT count(*) FROM blogs WHERE typeof(body) = 'blob'")).scalar()
+        ids = conn.scalars(select(models.Blog.id)).all()
+        user_ids = conn.scalars(select(func.distinct(models.Blog.user_id))).all()
+    engine.dispose()
+
+    # No pooling: every query gets a cold connection
+    engine = create_engine(url, poolclass=NullPool)
+    result = {
+        "mode": f"compressed >= {min_bytes} B" if min_bytes else "plain",
+        "file MB": os.path.getsize(path) / 1e6,
+        "blogs pages": blog_pages,
+        "compressed": compressed,
+        "queries": {name: measure(engine, query, ids, user_ids, runs) for name, query in queries(models).items()},
+    }
+    engine.dispose()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--blogs", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200, help="runs of each query")
+    parser.add_argument("--min-bytes", type=int, default=1024, help="compression threshold to compare")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # blog.database connects at import; keep it off the working directory
+        os.environ["BLOG_DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'blog.db')}"
+        results = [run(os.path.join(tmp, f"{mode}.db"), min_bytes, args.users, args.blogs, args.queries)
+                   for mode, min_bytes in (("plain", 0), ("compressed", args.min_bytes))]
+
+    print(f"{'':<24}" + "".join(f"{r['mode']:>24}" for r in results))
+    print(f"{'file MB':<24}" + "".join(f"{r['file MB']:>24.1f}" for r in results))
+    print(f"{'blogs table pages':<24}" + "".join(f"{r['blogs pages']:>24}" for r in results))
+    print(f"{'compressed bodies':<24}" + "".join(f"{r['compressed']:>24}" for r in results))
+    for name in results[0]["queries"]:
+        print(f"{name + ' pages / ms':<24}" + "".join(
+            f"{r['queries'][name][0]:>16.1f} / {r['queries'][name][1] * 1000:>5.2f}" for r in results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""Concurrent load test of every PART-3 route, with per-endpoint latency percentiles.
+
+In-process through the ASGI app, on a fresh seeded database:
+
+    python -m benchmarks.load --users 100 --blogs 10000 --concurrency 32 --duration 10 --json run.json
+
+Against a running server, seeding the database file it serves:
+
+    python -m benchmarks.load --base-url http://127.0.0.1:8000 --url sqlite:///./blog.db ...
+
+Compare against a saved run and exit 1 on regressions:
+
+    python -m benchmarks.load ... --baseline baseline.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+import httpx
+
+# (label, weight): how often each route is hit relative to the others
+MIX = [
+    ("GET /blog/", 20),
+    ("GET /blog/{id}", 30),
+    ("GET /blog/search", 10),
+    ("GET /user/{id}", 15),
+    ("POST /blog/", 8),
+    ("PUT /blog/{id}", 5),
+    ("DELETE /blog/{id}", 3),
+    ("POST /blog/bulk", 1),
+    ("PUT /blog/bulk", 1),
+    ("POST /blog/bulk/delete", 1),
+    ("POST /user/", 1),
+    ("POST /login", 1),
+]
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(q / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class Workload:
+    def __init__(self, client: httpx.AsyncClient, dataset: dict, rng: random.Random):
+        self.client = client
+        self.rng = rng
+        self.emails = dataset["emails"]
+        self.password = dataset["password"]
+        self.user_ids = dataset["user_ids"]
+        self.blog_ids = dataset["blog_ids"]
+        self.created = []  # blogs this run may delete
+        self.headers = {}
+
+    async def login(self, email: str):
+        response = await self.client.post("/login", data={"username": email, "password": self.password})
+        response.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return response
+
+    def some_blog(self) -> int:
+        return self.rng.choice(self.blog_ids)
+
+    def post(self) -> dict:
+        words = ["bench", "post", str(self.rng.random())]
+        return {"title": " ".join(words), "body": " ".join(words * 50)}
+
+    async def run(self, label: str):
+        c, h, rng = self.client, self.headers, self.rng
+        if label == "GET /blog/":
+            return await c.get("/blog/", params={"limit": 50}, headers=h)
+        if label == "GET /blog/{id}":
+            return await c.get(f"/blog/{self.some_blog()}", headers=h)
+        if label == "GET /blog/search":
+            return await c.get("/blog/search", params={"q": rng.choice(["fastapi", "cache latency", "sqlite index"]), "limit": 20}, headers=h)
+        if label == "GET /user/{id}":
+            return await c.get(f"/user/{rng.choice(self.user_ids)}", params={"summary": rng.random() < 0.5})
+        if label == "POST /blog/":
+            response = await c.post("/blog/", json=self.post(), headers=h)
+            if response.status_code == 201:
+                self.created.append(response.json()["id"])
+            return response
+        if label == "PUT /blog/{id}":
+            return await c.put(f"/blog/{self.some_blog()}", json=self.post(), headers=h)
+        if label == "DELETE /blog/{id}":
+            if not self.created:
+                return None
+            return await c.delete(f"/blog/{self.created.pop()}", headers=h)
+        if label == "POST /blog/bulk":
+            response = await c.post("/blog/bulk", json=[self.post() for _ in range(50)], headers=h)
+            if response.status_code == 200:
+                self.created.extend(item["id"] for item in response.json()["results"])
+            return response
+        if label == "PUT /blog/bulk":
+            items = [{"id": self.some_blog(), **self.post()} for _ in range(50)]
+            return await c.put("/blog/bulk", json=items, headers=h)
+        if label == "POST /blog/bulk/delete":
+            if not self.created:
+                return None
+            ids, self.created = self.created[:50], self.created[50:]
+            return await c.post("/blog/bulk/delete", json={"ids": ids}, headers=h)
+        if label == "POST /user/":
+            n = rng.getrandbits(64)
+            return await c.post("/user/", json={"name": "bench", "email": f"load{n}@example.com", "password": "pw"})
+        if label == "POST /login":
+            return await self.login(rng.choice(self.emails))
+        raise ValueError(label)
+
+
+async def drive(client: httpx.AsyncClient, dataset: dict, concurrency: int, duration: float, seed: int):
+    samples = defaultdict(list)  # label -> latencies (s)
+    errors = defaultdict(int)
+    labels, weights = zip(*MIX)
+
+    # Log every worker in before the clock starts
+    workloads = [Workload(client, dataset, random.Random(seed + n)) for n in range(concurrency)]
+    await asyncio.gather(*(workload.login(dataset["emails"][n % len(dataset["emails"])])
+                           for n, workload in enumerate(workloads)))
+    deadline = time.perf_counter() + duration
+
+    async def worker(workload: Workload):
+        while time.perf_counter() < deadline:
+            label = workload.rng.choices(labels, weights)[0]
+            started = time.perf_counter()
+            try:
+                response = await workload.run(label)
+            except httpx.HTTPError:
+                errors[label] += 1
+                continue
+            if response is None:
+                continue
+            samples[label].append(time.perf_counter() - started)
+            # 404s are expected: workers race to update/delete the same posts
+            if response.status_code >= 400 and response.status_code != 404:
+                errors[label] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(workload) for workload in workloads))
+    elapsed = time.perf_counter() - started
+
+    report = {}
+    for label, _ in MIX:
+        latencies = sorted(samples[label])
+        report[label] = {
+            "requests": len(latencies),
+            "errors": errors[label],
+            "rps": len(latencies) / elapsed,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+        }
+    return report, elapsed
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Endpoints whose p95 grew, or whose throughput dropped, by more than `tolerance`."""
+    regressions = []
+    for label, current in report.items():
+        before = baseline.get(label)
+        if not before or not before["requests"] or not current["requests"]:
+            continue
+        if current["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{label}: p95 {before['p95_ms']:.1f}ms -> {current['p95_ms']:.1f}ms")
+        if current["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(f"{label}: throughput {before['rps']:.1f}/s -> {current['rps']:.1f}/s")
+    return regressions
+
+
+def print_report(report: dict, elapsed: float):
+    print(f"{'endpoint':<24}{'reqs':>8}{'err':>6}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for label, row in report.items():
+        print(f"{label:<24}{row['requests']:>8}{row['errors']:>6}{row['rps']:>9.1f}"
+              f"{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}{row['p99_ms']:>9.2f}")
+    total = sum(row["requests"] for row in report.values())
+    print(f"{total} requests in {elapsed:.1f}s ({total / elapsed:.1f}/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the PART-3 blog API")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--blogs", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--url", help="database URL to seed (default: a fresh temporary SQLite file)")
+    parser.add_argument("--base-url", help="drive a running server instead of the in-process ASGI app")
+    parser.add_argument("--json", help="write the machine-readable report here")
+    parser.add_argument("--baseline", help="compare against a report written by --json")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    tmp = None
+    if args.url is None:
+        tmp = tempfile.TemporaryDirectory()
+        args.url = f"sqlite:///{os.path.join(tmp.name, 'bench.db')}"
+    # Must be set before blog.* builds its engine
+    os.environ["BLOG_DATABASE_URL"] = args.url
+
+    from sqlalchemy import create_engine
+    from blog import migrations
+    from .seed import seed
+
+    engine = create_engine(args.url)
+    migrations.upgrade(engine)
+    dataset = seed(engine, args.users, args.blogs, rng_seed=args.seed)
+    engine.dispose()
+    print(f"Seeded {args.users} users / {args.blogs} blogs in {dataset['seconds']:.1f}s")
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        from blog.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+    async def run():
+        async with client:
+            return await drive(client, dataset, args.concurrency, args.duration, args.seed)
+
+    report, elapsed = asyncio.run(run())
+    print_report(report, elapsed)
+
+    result = {
+        "config": {key: getattr(args, key) for key in ("users", "blogs", "concurrency", "duration", "base_url")},
+        "elapsed_s": elapsed,
+        "endpoints": report,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f)["endpoints"], args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+    if tmp is not None:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Cost of the /metrics middleware per request, and of one scrape.
+
+Run from Fast API/PART-3:
+
+    python -m benchmarks.metrics --requests 20000 --routes 50
+
+Requests are driven straight through the ASGI interface of a one-route
+FastAPI app, with and without blog.metrics installed, so the difference is
+the middleware itself rather than network or database time. The scrape is
+timed with `--routes` route templates x 3 statuses of latency series.
+"""
+import argparse
+import asyncio
+import random
+import time
+from fastapi import FastAPI
+
+
+def make_app(with_metrics: bool) -> FastAPI:
+    from blog import metrics
+
+    app = FastAPI()
+
+    @app.get("/items/{id}")
+    async def item(id: int):
+        return {"id": id}
+
+    if with_metrics:
+        metrics.install(app)
+    return app
+
+
+async def drive(app, requests: int) -> float:
+    """Mean seconds per GET /items/{id}."""
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    def scope(id: int) -> dict:
+        return {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": f"/items/{id}", "raw_path": f"/items/{id}".encode(),
+            "query_string": b"", "root_path": "", "headers": [], "client": ("bench", 1), "server": ("bench", 80),
+        }
+
+    for id in range(200):  # warm up
+        await app(scope(id), receive, send)
+    started = time.perf_counter()
+    for id in range(requests):
+        await app(scope(id), receive, send)
+    return (time.perf_counter() - started) / requests
+
+
+def scrape_ms(routes: int, scrapes: int) -> tuple:
+    from blog import metrics
+
+    rng = random.Random(7)
+    for _ in range(routes * 100):
+        labels = ("GET", f"/route{rng.randrange(routes)}/{{id}}", rng.choice((200, 404, 500)))
+        metrics.request_duration.observe(labels, rng.expovariate(50))
+    started = time.perf_counter()
+    for _ in range(scrapes):
+        body = metrics.render()
+    return (time.perf_counter() - started) / scrapes * 1000, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--routes", type=int, default=50, help="route templates in the scraped histogram")
+    parser.add_argument("--scrapes", type=int, default=100)
+    args = parser.parse_args()
+
+    bare = asyncio.run(drive(make_app(False), args.requests))
+    measured = asyncio.run(drive(make_app(True), args.requests))
+    print(f"{'':<20}{'us/request':>12}")
+    print(f"{'no metrics':<20}{bare * 1e6:>12.1f}")
+    print(f"{'metrics':<20}{measured * 1e6:>12.1f}   +{(measured - bare) * 1e6:.1f} us")
+
+    ms, size = scrape_ms(args.routes, args.scrapes)
+    print(f"scrape with {args.routes * 3} series: {ms:.2f} ms, {size / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
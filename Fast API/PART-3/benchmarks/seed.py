@@ -0,0 +1,75 @@
+"""Seed a synthetic blog dataset with bulk inserts.
+
+    python -m benchmarks.seed --users 1000 --blogs 100000 [--url sqlite:///./bench.db]
+"""
+import argparse
+import random
+import time
+import uuid
+from sqlalchemy import create_engine, insert, select
+from blog import migrations, models
+from blog.hashing import pwd_cxt
+
+PASSWORD = "bench-password"
+WORDS = (
+    "api fastapi python sqlite database index query cache latency throughput request response "
+    "router schema token user blog post search page cursor stream async pool commit write read "
+    "benchmark profile metric trace shard replica backup json model validation server client"
+).split()
+
+
+def body_of(rng: random.Random) -> str:
+    # Log-normal word counts: most posts are a few hundred words, a few are very long
+    words = min(max(int(rng.lognormvariate(5.7, 0.8)), 20), 5000)
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def seed(engine, users: int, blogs: int, batch: int = 5000, rng_seed: int = 42) -> dict:
+    """Insert `users` users and `blogs` blogs; returns what the load test needs."""
+    rng = random.Random(rng_seed)
+    tag = uuid.uuid4().hex[:8]  # lets several runs share one database
+    password = pwd_cxt.hash(PASSWORD)  # bcrypt once, shared by every synthetic user
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        user_ids = conn.scalars(
+            insert(models.User).returning(models.User.id, sort_by_parameter_order=True),
+            [{"name": f"user {i}", "email": f"bench{tag}_{i}@example.com", "password": password}
+             for i in range(users)],
+        ).all()
+
+    for start in range(0, blogs, batch):
+        rows = [{"title": " ".join(rng.choices(WORDS, k=rng.randint(3, 10))),
+                 "body": body_of(rng),
+                 "user_id": rng.choice(user_ids)}
+                for _ in range(start, min(start + batch, blogs))]
+        with engine.begin() as conn:
+            conn.execute(insert(models.Blog), rows)
+
+    with engine.connect() as conn:
+        blog_ids = conn.scalars(select(models.Blog.id)).all()
+    return {
+        "emails": [f"bench{tag}_{i}@example.com" for i in range(users)],
+        "password": PASSWORD,
+        "user_ids": list(user_ids),
+        "blog_ids": list(blog_ids),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a synthetic blog dataset")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--blogs", type=int, default=10000)
+    parser.add_argument("--url", help="database URL (defaults to BLOG_DATABASE_URL)")
+    args = parser.parse_args()
+
+    from blog import config
+    engine = create_engine(args.url or config.SQLALCHEMY_DATABASE_URL)
+    migrations.upgrade(engine)
+    result = seed(engine, args.users, args.blogs)
+    print(f"Seeded {args.users} users and {args.blogs} blogs in {result['seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""GET /blog/ page serialization: ORM objects + response_model vs Core rows + orjson.
+
+    python -m benchmarks.serialization --rows 1000 --iterations 200
+
+Both versions are mounted on a bare FastAPI app (no auth, no middleware) over
+the same seeded database, and their bodies are checked to be byte-identical
+before anything is timed.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import List
+import httpx
+
+# Exercises JSON escaping: non-ASCII, quotes, backslashes, control characters
+AWKWARD = 'é ✓ 日本 "quoted" back\\slash tab\there new\nline \x01 emoji 🎉'
+
+
+def build_app(SessionLocal):
+    from fastapi import Depends, FastAPI, Request
+    from sqlalchemy.orm import Session, undefer
+    from blog import models, schemas, serialization
+    from blog.repository import blog
+
+    app = FastAPI()
+
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    # The implementation GET /blog/ had before the fast path (body is deferred since)
+    @app.get("/orm", response_model=List[schemas.ShowBlog])
+    def orm(limit: int, db: Session = Depends(get_db)):
+        return db.query(models.Blog).options(undefer(models.Blog.body)).order_by(models.Blog.id).limit(limit).all()
+
+    @app.get("/fast", response_model=List[schemas.ShowBlog])
+    def fast(request: Request, limit: int, db: Session = Depends(get_db)):
+        blogs, next_cursor = blog.get_all(db, limit)
+        return serialization.blog_list(blogs, request, limit, next_cursor)
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, path: str, rows: int, iterations: int) -> float:
+    await client.get(path, params={"limit": rows})  # warm up
+    started = time.perf_counter()
+    for _ in range(iterations):
+        response = await client.get(path, params={"limit": rows})
+        response.raise_for_status()
+    return (time.perf_counter() - started) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the GET /blog/ fast serialization path")
+    parser.add_argument("--rows", type=int, default=1000, help="blogs per page")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ["BLOG_DATABASE_URL"] = url
+
+        from sqlalchemy import create_engine, insert
+        from sqlalchemy.orm import sessionmaker
+        from blog import migrations, models
+        from .seed import seed
+
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+        migrations.upgrade(engine)
+        seed(engine, users=10, blogs=args.rows)
+        with engine.begin() as conn:
+            conn.execute(insert(models.Blog).values(title=AWKWARD, body=AWKWARD * 10, user_id=1))
+
+        app = build_app(sessionmaker(bind=engine, autoflush=False))
+
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                limit = args.rows + 1
+                orm_body = (await client.get("/orm", params={"limit": limit})).content
+                fast_body = (await client.get("/fast", params={"limit": limit})).content
+                assert orm_body == fast_body, "fast path output differs from response_model output"
+                print(f"Bodies are byte-identical ({len(fast_body)} bytes for {limit} blogs)")
+                return (await measure(client, "/orm", args.rows, args.iterations),
+                        await measure(client, "/fast", args.rows, args.iterations))
+
+        orm_s, fast_s = asyncio.run(run())
+        engine.dispose()
+
+    print(f"ORM + response_model : {orm_s * 1000:8.2f} ms/request")
+    print(f"Core rows + orjson   : {fast_s * 1000:8.2f} ms/request")
+    print(f"Speedup              : {orm_s / fast_s:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Blog write throughput against the number of shard files.
+
+Run from Fast API/PART-3:
+
+    python -m benchmarks.sharding --shards 1,2,4,8 --writers 16 --seconds 5
+
+Every writer is a separate process (like one uvicorn worker) inserting one
+blog per transaction for a random author through ShardSet.insert, the path
+POST /blog takes in sharded mode. With one file they all queue on its write
+lock; with N files each shard has its own.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+BODY = "lorem ipsum " * 100
+
+
+def writer(urls: list, start_at: float, seconds: float, users: int) -> tuple:
+    from sqlalchemy.exc import OperationalError
+    from blog import sharding
+
+    shard_set = sharding.ShardSet(urls)
+    time.sleep(max(0.0, start_at - time.time()))
+    stop_at = start_at + seconds
+    done = errors = 0
+    while time.time() < stop_at:
+        try:
+            shard_set.insert([{"title": "bench", "body": BODY, "user_id": random.randint(1, users)}])
+            done += 1
+        except OperationalError:  # "database is locked"
+            errors += 1
+    return done, errors
+
+
+def run(shards: int, writers: int, seconds: float, users: int) -> dict:
+    from blog import migrations, sharding
+
+    with tempfile.TemporaryDirectory() as tmp:
+        urls = [f"sqlite:///{os.path.join(tmp, f'shard{i}.db')}" for i in range(shards)]
+        shard_set = sharding.ShardSet(urls)
+        for engine in shard_set.engines:
+            migrations.upgrade(engine)
+
+        with ProcessPoolExecutor(max_workers=writers) as pool:
+            # Leave the workers time to start and import before the clock runs
+            start_at = time.time() + 2
+            futures = [pool.submit(writer, urls, start_at, seconds, users) for _ in range(writers)]
+            results = [future.result() for future in futures]
+        writes = sum(done for done, _ in results)
+
+        # Fan-out read of the first page, merged across shards
+        started = time.perf_counter()
+        shard_set.page(100)
+        page_ms = (time.perf_counter() - started) * 1000
+        for engine in shard_set.engines:
+            engine.dispose()
+
+    return {
+        "shards": shards,
+        "writes/s": writes / seconds,
+        "errors": sum(errors for _, errors in results),
+        "page ms": page_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shards", default="1,2,4,8", help="comma-separated shard counts to compare")
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--users", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # blog.database connects at import; keep it off the working directory
+        os.environ["BLOG_DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'blog.db')}"
+        os.environ.pop("BLOG_SHARD_URLS", None)
+
+        print(f"{'shards':<8}{'writes/s':>12}{'errors':>10}{'page ms':>10}")
+        baseline = None
+        for count in (int(n) for n in args.shards.split(",")):
+            result = run(count, args.writers, args.seconds, args.users)
+            baseline = baseline or result["writes/s"]
+            print(f"{result['shards']:<8}{result['writes/s']:>12.0f}{result['errors']:>10}{result['page ms']:>10.2f}"
+                  f"   x{result['writes/s'] / baseline:.2f}")
+
+
+if __name__ == "__main__":
+    main()
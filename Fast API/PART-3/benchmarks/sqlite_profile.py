@@ -0,0 +1,107 @@
+"""Concurrent read/write throughput on SQLite, with and without the production profile.
+
+Run from Fast API/PART-3:
+
+    python -m benchmarks.sqlite_profile --writers 4 --readers 8 --seconds 5
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from blog import sqlite_profile
+
+BODY = "lorem ipsum " * 100
+
+
+def make_engine(path: str, profile: bool, pool_size: int):
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False},
+        pool_size=pool_size, max_overflow=0,
+    )
+    if profile:
+        sqlite_profile.install(engine, sqlite_profile.PRODUCTION_PRAGMAS)
+    return engine
+
+
+def seed(engine, rows: int):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE blogs (id INTEGER PRIMARY KEY, title VARCHAR, body VARCHAR, user_id INTEGER)"))
+        conn.execute(
+            text("INSERT INTO blogs (title, body, user_id) VALUES (:title, :body, 1)"),
+            [{"title": f"seed {i}", "body": BODY} for i in range(rows)],
+        )
+
+
+def run(profile: bool, writers: int, readers: int, seconds: float, rows: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, "bench.db"), profile, writers + readers)
+        seed(engine, rows)
+        stop = time.monotonic() + seconds
+        counts = {"reads": 0, "writes": 0, "errors": 0}
+        lock = threading.Lock()
+
+        def reader():
+            done = errors = 0
+            while time.monotonic() < stop:
+                try:
+                    with engine.connect() as conn:
+                        conn.execute(text("SELECT title, body FROM blogs WHERE id = :id"),
+                                     {"id": random.randint(1, rows)}).first()
+                    done += 1
+                except OperationalError:
+                    errors += 1
+            with lock:
+                counts["reads"] += done
+                counts["errors"] += errors
+
+        def writer():
+            done = errors = 0
+            while time.monotonic() < stop:
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(text("INSERT INTO blogs (title, body, user_id) VALUES ('bench', :body, 1)"),
+                                     {"body": BODY})
+                    done += 1
+                except OperationalError:  # "database is locked"
+                    errors += 1
+            with lock:
+                counts["writes"] += done
+                counts["errors"] += errors
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads += [threading.Thread(target=writer) for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    return {
+        "profile": "production" if profile else "default",
+        "reads/s": counts["reads"] / seconds,
+        "writes/s": counts["writes"] / seconds,
+        "errors": counts["errors"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--rows", type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"{'profile':<12}{'reads/s':>12}{'writes/s':>12}{'errors':>10}")
+    for profile in (False, True):
+        result = run(profile, args.writers, args.readers, args.seconds, args.rows)
+        print(f"{result['profile']:<12}{result['reads/s']:>12.0f}{result['writes/s']:>12.0f}{result['errors']:>10}")
+
+
+if __name__ == "__main__":
+    main()
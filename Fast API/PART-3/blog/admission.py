@@ -0,0 +1,257 @@
+"""Admission control: per-principal rate limits, per-router concurrency, load shedding.
+
+Three checks run before a request reaches the database:
+
+- every authenticated principal has a token bucket (config.RATE_LIMIT_PER_SECOND,
+  RATE_LIMIT_BURST); an empty bucket answers 429 with Retry-After.
+- each router (blog, user, authentication) admits at most
+  config.ROUTER_CONCURRENCY[name] requests at once; up to ADMISSION_QUEUE_DEPTH
+  more wait up to ADMISSION_QUEUE_TIMEOUT_MS for a slot, the rest get a 503.
+- while the average DB pool checkout wait is above SHED_POOL_WAIT_MS, new
+  requests get a 503 straight away instead of queueing for a connection.
+
+Counters are served at GET /stats/admission. Everything is per worker process.
+"""
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from fastapi import HTTPException, status
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from . import config, metrics, schemas
+
+
+def _unavailable(detail: str, retry_after: int = 1) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=detail,
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+# ---------- DB pool checkout wait ----------
+
+class PoolWait:
+    """Moving average of DB pool checkout times that decays while no checkouts happen.
+
+    The decay lets shedding stop on its own: once requests are turned away
+    nothing checks out, and the average halves every `half_life` seconds.
+    """
+
+    def __init__(self, weight: float = 0.2, half_life: float = 1.0):
+        self.weight = weight
+        self.half_life = half_life
+        self._value = 0.0
+        self._at = time.monotonic()
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.max = 0.0
+
+    def _decayed(self, now: float) -> float:
+        return self._value * 0.5 ** ((now - self._at) / self.half_life)
+
+    def record(self, seconds: float):
+        now = time.monotonic()
+        with self._lock:
+            current = self._decayed(now)
+            self._value = current + self.weight * (seconds - current)
+            self._at = now
+            self.checkouts += 1
+            self.max = max(self.max, seconds)
+
+    def current(self) -> float:
+        with self._lock:
+            return self._decayed(time.monotonic())
+
+
+pool_wait = PoolWait()
+
+
+class _TimedCheckout:
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            seconds = time.perf_counter() - started
+            pool_wait.record(seconds)
+            metrics.observe_checkout(seconds)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    """QueuePool that reports how long every checkout took to pool_wait and /metrics."""
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    """Async-engine version of TimedQueuePool."""
+
+
+# ---------- Per-principal token buckets ----------
+
+class TokenBuckets:
+    """One bucket of `burst` tokens per key, refilled at `rate` per second.
+
+    At most `maxsize` keys are kept; the least recently seen is dropped first
+    (it comes back with a full bucket).
+    """
+
+    def __init__(self, rate: float, burst: int, maxsize: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.limited = 0
+
+    def take(self, key) -> float:
+        """Spend one token: 0 if there was one, else seconds until there is."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+                self.allowed += 1
+            else:
+                wait = (1 - tokens) / self.rate
+                self.limited += 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rate_per_second": self.rate,
+                "burst": self.burst,
+                "principals": len(self._buckets),
+                "allowed": self.allowed,
+                "limited": self.limited,
+            }
+
+
+buckets = None
+if config.RATE_LIMIT_PER_SECOND > 0:
+    buckets = TokenBuckets(config.RATE_LIMIT_PER_SECOND, config.RATE_LIMIT_BURST)
+
+
+def check_rate(principal: schemas.Principal):
+    """Called by oauth2.get_current_user once the caller is known."""
+    if buckets is None:
+        return
+    wait = buckets.take(principal.id)
+    if wait:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded, please retry later",
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
+
+
+# ---------- Per-router concurrency gates ----------
+
+class RouterGate:
+    """Router-level dependency: a concurrency limit with a short, bounded wait queue.
+
+    Only touched from the event loop (async dependency), so no lock is needed.
+    `limit` None admits everything, subject to pool-wait shedding.
+    """
+
+    def __init__(self, name: str, limit, queue_depth: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_depth = queue_depth
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters = deque()
+        self.admitted = 0
+        self.queued = 0
+        self.shed_queue_full = 0
+        self.shed_queue_timeout = 0
+        self.shed_pool_wait = 0
+
+    async def __call__(self):
+        if config.SHED_POOL_WAIT_MS and pool_wait.current() * 1000 > config.SHED_POOL_WAIT_MS:
+            self.shed_pool_wait += 1
+            raise _unavailable("Database is overloaded, please retry")
+        await self._acquire()
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self):
+        if self.limit is None or (self.in_flight < self.limit and not self._waiters):
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.queue_depth:
+            self.shed_queue_full += 1
+            raise _unavailable(f"Too many {self.name} requests in progress, please retry")
+
+        slot = asyncio.get_running_loop().create_future()
+        self._waiters.append(slot)
+        self.queued += 1
+        try:
+            done, _ = await asyncio.wait([slot], timeout=self.queue_timeout)
+        except BaseException:
+            # Client went away while waiting
+            self._abandon(slot)
+            raise
+        if not done:
+            self._abandon(slot)
+            self.shed_queue_timeout += 1
+            raise _unavailable(f"Too many {self.name} requests in progress, please retry")
+        # _release() handed its slot over; in_flight already counts it
+        self.admitted += 1
+
+    def _abandon(self, slot):
+        if slot.done() and not slot.cancelled():
+            self._release()  # granted just now, pass it on
+        else:
+            slot.cancel()
+            self._waiters.remove(slot)
+
+    def _release(self):
+        while self._waiters:
+            slot = self._waiters.popleft()
+            if not slot.done():
+                slot.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_queue_timeout": self.shed_queue_timeout,
+            "shed_pool_wait": self.shed_pool_wait,
+        }
+
+
+gates = {
+    name: RouterGate(name, config.ROUTER_CONCURRENCY.get(name), config.ADMISSION_QUEUE_DEPTH,
+                     config.ADMISSION_QUEUE_TIMEOUT_MS / 1000)
+    for name in ("blog", "user", "authentication")
+}
+
+
+def stats() -> dict:
+    return {
+        "pool_wait": {
+            "average_ms": pool_wait.current() * 1000,
+            "max_ms": pool_wait.max * 1000,
+            "checkouts": pool_wait.checkouts,
+            "shed_threshold_ms": config.SHED_POOL_WAIT_MS,
+        },
+        "rate_limit": buckets.stats() if buckets is not None else {"rate_per_second": 0},
+        "routers": {name: gate.stats() for name, gate in gates.items()},
+    }
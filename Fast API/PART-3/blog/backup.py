@@ -0,0 +1,222 @@
+"""Online backups of the SQLite database, taken while the app keeps serving.
+
+    python -m blog.backup backups/blog-2024-05-01.db
+    python -m blog.backup backups/blog-2024-05-01.db.gz --gzip
+    python -m blog.backup - --gzip | ssh backup-host 'cat > blog.db.gz'
+
+A plain file copy during writes can capture half of a transaction. This uses
+SQLite's backup API instead, `pages` pages per step with a `pause` between
+steps, so a large copy never holds the disk or a lock for long.
+
+In WAL mode (the production profile) the source connection keeps one read
+transaction open for the whole copy: every step reads the same snapshot, and
+writers, who append to the WAL, are never blocked. (The WAL cannot be
+checkpointed past that snapshot meanwhile, so it grows until the copy ends.)
+In rollback-journal mode, writers get in between steps, and a write makes the
+backup start over. After `max_restarts` of those the copy holds a read lock
+on the source and finishes without pauses; writers wait (up to their busy
+timeout) until it is done.
+
+The copy is written next to the destination and renamed into place when it
+is complete, so a backup file is never half-written. --gzip compresses the
+finished snapshot while streaming it to the destination (or stdout).
+"""
+import argparse
+import gzip
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from sqlalchemy.engine import make_url
+
+# Pages per backup step (4 MB with the default 4 KB pages) and the pause after each
+DEFAULT_PAGES = 1024
+DEFAULT_PAUSE_MS = 5.0
+# Restarts of a rollback-journal backup before it locks writers out to finish
+DEFAULT_MAX_RESTARTS = 3
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def sqlite_path(url: str) -> str:
+    """The file behind a sqlite:// URL."""
+    url = make_url(url)
+    if not url.drivername.startswith("sqlite") or url.database in (None, "", ":memory:"):
+        raise ValueError(f"Only SQLite database files can be backed up, not {url.render_as_string()}")
+    return url.database
+
+
+class Progress:
+    """Backup progress callback: throughput, restarts and, every `interval` seconds, a report line."""
+
+    def __init__(self, pause: float, report=None, interval: float = 1.0, max_restarts: int = None):
+        self.pause = pause
+        self.max_restarts = max_restarts
+        self.report = report
+        self.interval = interval
+        self.started = time.perf_counter()
+        self._last_report = self.started
+        self.steps = 0
+        self.restarts = 0
+        self.copied = 0
+        self.total = 0
+        self._remaining = None
+
+    def __call__(self, status: int, remaining: int, total: int):
+        self.steps += 1
+        if self._remaining is not None and remaining > self._remaining:
+            self.restarts += 1  # the source changed under a rollback-journal backup
+            if self.max_restarts is not None and self.restarts > self.max_restarts:
+                raise _TooManyRestarts
+        self._remaining = remaining
+        self.total = total
+        self.copied = total - remaining
+        now = time.perf_counter()
+        if self.report is not None and (now - self._last_report >= self.interval or not remaining):
+            self._last_report = now
+            self.report(self)
+        if remaining and self.pause:
+            time.sleep(self.pause)  # let writers (and the disk) breathe
+
+    @property
+    def seconds(self) -> float:
+        return time.perf_counter() - self.started
+
+    def line(self, page_size: int) -> str:
+        done = self.copied / self.total if self.total else 1.0
+        mb = self.copied * page_size / 1e6
+        return (f"{done:6.1%}  {self.copied}/{self.total} pages  {mb:.1f} MB  "
+                f"{mb / max(self.seconds, 1e-9):.1f} MB/s  restarts={self.restarts}")
+
+
+def _copy(src, dest: str, pages: int, progress: Progress):
+    dst = sqlite3.connect(dest, isolation_level=None)
+    try:
+        src.backup(dst, pages=pages, progress=progress)
+        # The copy inherits WAL mode; make it one self-contained file
+        dst.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        dst.close()
+
+
+def _read_snapshot(src):
+    """Open a read transaction on `src`, pinning the database as it is now."""
+    src.execute("BEGIN")
+    src.execute("SELECT count(*) FROM sqlite_master").fetchone()
+
+
+def snapshot(source: str, dest: str, pages: int = DEFAULT_PAGES, pause: float = DEFAULT_PAUSE_MS / 1000,
+             report=None, max_restarts: int = DEFAULT_MAX_RESTARTS) -> dict:
+    """Copy the SQLite file `source` to `dest` (a new file) through the backup API.
+
+    `report(progress, page_size)` is called about once a second. Returns the
+    run's counters: pages, bytes, seconds, steps, restarts and whether the
+    copy had to lock writers out.
+    """
+    src = sqlite3.connect(source, isolation_level=None, timeout=30)
+    try:
+        page_size = src.execute("PRAGMA page_size").fetchone()[0]
+        wal = src.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+        on_progress = report and (lambda p: report(p, page_size))
+        progress = Progress(pause, on_progress, max_restarts=None if wal else max_restarts)
+        locked = False
+        if wal:
+            # One snapshot for every step: no restarts, and writers carry on in the WAL
+            _read_snapshot(src)
+        try:
+            _copy(src, dest, pages, progress)
+        except _TooManyRestarts:
+            os.remove(dest)
+            locked = True
+            _read_snapshot(src)  # a shared lock: writers wait until the copy is done
+            gave_up = progress
+            progress = Progress(0, on_progress)
+            progress.started, progress.restarts = gave_up.started, gave_up.restarts
+            _copy(src, dest, pages, progress)
+        if wal or locked:
+            src.execute("COMMIT")
+    finally:
+        src.close()
+    return {
+        "pages": progress.total,
+        "bytes": progress.total * page_size,
+        "seconds": progress.seconds,
+        "steps": progress.steps,
+        "restarts": progress.restarts,
+        "locked": locked,
+    }
+
+
+def backup(source: str, dest: str, compress: bool = False, level: int = 6, pages: int = DEFAULT_PAGES,
+           pause: float = DEFAULT_PAUSE_MS / 1000, report=None) -> dict:
+    """Snapshot `source` into `dest` ("-" for stdout), gzip-compressed if asked."""
+    to_stdout = dest == "-"
+    if to_stdout and not compress:
+        raise ValueError("Writing to stdout needs --gzip (a live SQLite file cannot be streamed)")
+    # Snapshot beside the destination (same filesystem, so the rename is atomic)
+    directory = os.path.dirname(os.path.abspath(source if to_stdout else dest))
+    fd, partial = tempfile.mkstemp(prefix=".backup-", suffix=".db", dir=directory)
+    os.close(fd)
+    os.remove(partial)  # the backup API creates it
+    try:
+        stats = snapshot(source, partial, pages, pause, report)
+        if not compress:
+            os.replace(partial, dest)
+            stats["written_bytes"] = os.path.getsize(dest)
+            return stats
+
+        started = time.perf_counter()
+        if to_stdout:
+            with open(partial, "rb") as raw, gzip.GzipFile(fileobj=sys.stdout.buffer, mode="wb",
+                                                          compresslevel=level) as out:
+                shutil.copyfileobj(raw, out, 1024 * 1024)
+            stats["written_bytes"] = None
+        else:
+            packed = partial + ".gz"
+            with open(partial, "rb") as raw, gzip.open(packed, "wb", compresslevel=level) as out:
+                shutil.copyfileobj(raw, out, 1024 * 1024)
+            os.replace(packed, dest)
+            stats["written_bytes"] = os.path.getsize(dest)
+        stats["compress_seconds"] = time.perf_counter() - started
+        return stats
+    finally:
+        for leftover in (partial, partial + ".gz"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Online backup of the blog SQLite database")
+    parser.add_argument("dest", help='backup file to create, or "-" for stdout (with --gzip)')
+    parser.add_argument("--url", help="database URL (defaults to BLOG_DATABASE_URL)")
+    parser.add_argument("--gzip", action="store_true", help="write the snapshot gzip-compressed")
+    parser.add_argument("--level", type=int, default=6, help="gzip level, 1 (fast) to 9 (small)")
+    parser.add_argument("--pages", type=int, default=DEFAULT_PAGES, help="pages copied per step")
+    parser.add_argument("--pause-ms", type=float, default=DEFAULT_PAUSE_MS, help="pause between steps")
+    args = parser.parse_args()
+
+    from . import config
+    source = sqlite_path(args.url or config.SQLALCHEMY_DATABASE_URL)
+    if args.dest == "-" and not args.gzip:
+        parser.error("writing to stdout needs --gzip")
+    if args.dest != "-" and os.path.exists(args.dest):
+        parser.error(f"{args.dest} already exists")
+
+    def report(progress: Progress, page_size: int):
+        print(progress.line(page_size), file=sys.stderr)
+
+    stats = backup(source, args.dest, args.gzip, args.level, args.pages, args.pause_ms / 1000, report)
+    summary = (f"Backed up {source}: {stats['bytes'] / 1e6:.1f} MB in {stats['seconds']:.1f} s "
+               f"({stats['bytes'] / 1e6 / max(stats['seconds'], 1e-9):.1f} MB/s, {stats['steps']} steps, "
+               f"{stats['restarts']} restarts{', writers locked out' if stats['locked'] else ''})")
+    if stats.get("written_bytes"):
+        summary += f", wrote {stats['written_bytes'] / 1e6:.1f} MB to {args.dest}"
+    print(summary, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+from fastapi import Request, Response, status
+from pydantic import BaseModel
+from . import config, replicas
+
+
+class MemoryCache:
+    """Bounded in-process LRU with a TTL, plus tags for group invalidation.
+
+    Any object with the same get/set/version/invalidate_tag/clear methods can
+    be plugged in with set_backend().
+
+    Invalidations tick a clock and stamp their tag with it. A reader takes
+    version() before its database read and passes it to set(), which drops
+    the value when one of its tags was invalidated since: the read may have
+    seen the row from before that write.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tags = {}                # tag -> set of keys
+        self._clock = 0
+        self._invalidated = OrderedDict()  # tag -> clock at its last invalidation, oldest first
+        self._forgotten = 0                # newest clock dropped from _invalidated
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def version(self) -> int:
+        with self._lock:
+            return self._clock
+
+    def set(self, key: str, value, tags: Iterable[str] = (), version: Optional[int] = None):
+        with self._lock:
+            # A tag not stamped (any more) counts as invalidated at the newest forgotten stamp
+            if version is not None and any(self._invalidated.get(tag, self._forgotten) > version for tag in tags):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, tuple(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_tag(self, tag: str):
+        with self._lock:
+            self._clock += 1
+            self._invalidated[tag] = self._clock
+            self._invalidated.move_to_end(tag)
+            while len(self._invalidated) > self.maxsize:
+                _, self._forgotten = self._invalidated.popitem(last=False)
+            for key in self._tags.pop(tag, ()):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._clock += 1
+            self._invalidated.clear()
+            self._forgotten = self._clock
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class NullCache:
+    """Backend for BLOG_CACHE_BACKEND=none: never stores anything."""
+
+    def get(self, key: str):
+        return None
+
+    def version(self) -> int:
+        return 0
+
+    def set(self, key: str, value, tags: Iterable[str] = (), version: Optional[int] = None):
+        pass
+
+    def invalidate_tag(self, tag: str):
+        pass
+
+    def clear(self):
+        pass
+
+
+backend = MemoryCache(config.CACHE_SIZE, config.CACHE_TTL) if config.CACHE_BACKEND == "memory" else NullCache()
+
+
+def set_backend(new_backend):
+    global backend
+    backend = new_backend
+
+
+# ---------- Keys and invalidation ----------
+
+def blog_key(id: int) -> str:
+    return f"blog:{id}"
+
+def user_tag(id: int) -> str:
+    return f"user:{id}"
+
+def user_key(id: int, request: Request) -> str:
+    # GET /user/{id} varies with its pagination/summary query parameters
+    return f"{user_tag(id)}?{request.url.query}"
+
+def invalidate_blogs(blog_ids: Iterable[int] = (), user_ids: Iterable[Optional[int]] = ()):
+    """Called by the repository write paths after they commit."""
+    for id in blog_ids:
+        backend.invalidate_tag(blog_key(id))
+    # A user's response embeds their blogs, so blog writes invalidate the author too
+    invalidate_users(user_ids)
+
+def invalidate_users(user_ids: Iterable[Optional[int]]):
+    for id in set(user_ids):
+        if id is not None:
+            backend.invalidate_tag(user_tag(id))
+
+
+# ---------- Serialized responses with strong ETags ----------
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+def _respond(request: Request, body: bytes, etag: str) -> Response:
+    if _matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return Response(body, media_type="application/json", headers={"ETag": etag})
+
+def version() -> int:
+    """Take before the database read whose result goes to store()."""
+    return backend.version()
+
+def lookup(request: Request, key: str) -> Optional[Response]:
+    """Cached 200 (or 304 for a matching If-None-Match), or None on a miss.
+
+    A client that wrote within its read-your-writes window always misses: it
+    reads from the primary, like it would without the cache.
+    """
+    if replicas.recent_writers.recent(replicas.client_key(request.scope)):
+        return None
+    cached = backend.get(key)
+    if cached is None:
+        return None
+    return _respond(request, *cached)
+
+def store(request: Request, key: str, tag: str, model: BaseModel, version: Optional[int] = None,
+          fill: bool = True) -> Response:
+    """Serialize `model` once, cache the bytes under `key` and answer the request.
+
+    `version` is version() from before the read; the bytes are not cached if
+    `tag` was invalidated since. Pass fill=False for a result read from a
+    replica: it may predate a write that already invalidated the key, so it
+    is served but never cached.
+    """
+    body = model.model_dump_json().encode()
+    etag = _etag(body)
+    if fill:
+        backend.set(key, (body, etag), tags=(tag,), version=version)
+    return _respond(request, body, etag)
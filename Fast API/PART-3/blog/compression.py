@@ -0,0 +1,58 @@
+"""Transparent zlib compression of long blog bodies (config.BODY_COMPRESS_MIN_BYTES).
+
+On SQLite, a body of at least that many UTF-8 bytes is stored in blogs.body
+as a zlib BLOB, a shorter one as plain TEXT: SQLite keeps both storage
+classes in the same column, and CompressedText turns either back into str.
+Other databases always get plain text.
+
+Triggers and the FTS5 index read bodies through the blog_body() SQL function
+(see search.py), so it is registered on every SQLite connection this process
+opens. A plain `sqlite3` shell can still read the table, but writing to
+`blogs` there fails with "no such function: blog_body".
+"""
+import zlib
+from sqlalchemy import String, event
+from sqlalchemy.pool import Pool
+from sqlalchemy.types import TypeDecorator
+from . import config
+
+# SQL name of decompress(), used by the FTS triggers and content view
+SQL_FUNCTION = "blog_body"
+
+
+def compress(body):
+    """The value to store: zlib bytes for long bodies (when that is smaller), else the str itself."""
+    if body is None or not config.BODY_COMPRESS_MIN_BYTES:
+        return body
+    raw = body.encode()
+    if len(raw) < config.BODY_COMPRESS_MIN_BYTES:
+        return body
+    packed = zlib.compress(raw)
+    return packed if len(packed) < len(raw) else body
+
+
+def decompress(value):
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode()
+    return value
+
+
+class CompressedText(TypeDecorator):
+    """String column that compresses long values on SQLite."""
+
+    impl = String
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return compress(value) if dialect.name == "sqlite" else value
+
+    def process_result_value(self, value, dialect):
+        return decompress(value)
+
+
+@event.listens_for(Pool, "connect")
+def _register_sql_function(dbapi_connection, connection_record):
+    # Every pool, so migration, resharding and benchmark engines have it too
+    create_function = getattr(dbapi_connection, "create_function", None)
+    if create_function is not None:  # sqlite3 / aiosqlite
+        create_function(SQL_FUNCTION, 1, decompress, deterministic=True)
@@ -0,0 +1,128 @@
+import os
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+# ---------- Database ----------
+
+# Sync URL; the async driver URL is derived from it unless set explicitly
+SQLALCHEMY_DATABASE_URL = os.getenv("BLOG_DATABASE_URL", "sqlite:///./blog.db")
+ASYNC_DATABASE_URL = os.getenv("BLOG_ASYNC_DATABASE_URL")
+
+# "production" applies sqlite_profile.PRODUCTION_PRAGMAS (WAL etc.) to every connection, "off" keeps SQLite defaults
+SQLITE_PROFILE = os.getenv("BLOG_SQLITE_PROFILE", "production")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("BLOG_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("BLOG_SQLITE_CACHE_SIZE_KB", "64000"))
+SQLITE_MMAP_SIZE = int(os.getenv("BLOG_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+# Connection pool: persistent connections, extra burst connections, seconds to wait for one
+DB_POOL_SIZE = int(os.getenv("BLOG_DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("BLOG_DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("BLOG_DB_POOL_TIMEOUT", "30"))
+
+# Read replicas: comma-separated URLs the GET routes read from (empty = everything on the primary)
+REPLICA_URLS = [url.strip() for url in os.getenv("BLOG_REPLICA_URLS", "").split(",") if url.strip()]
+# After a successful write, the same client keeps reading from the primary for this long
+READ_YOUR_WRITES_SECONDS = float(os.getenv("BLOG_READ_YOUR_WRITES_SECONDS", "5"))
+
+# Spread blogs over these SQLite files by a hash of user_id (empty = blogs live in BLOG_DATABASE_URL)
+SHARD_URLS = [url.strip() for url in os.getenv("BLOG_SHARD_URLS", "").split(",") if url.strip()]
+
+# Store blog bodies of at least this many UTF-8 bytes zlib-compressed (SQLite only; 0 disables)
+BODY_COMPRESS_MIN_BYTES = int(os.getenv("BLOG_BODY_COMPRESS_MIN_BYTES", "1024"))
+
+# Apply pending schema migrations at startup; off = refuse to start until `python -m blog.migrations upgrade`
+AUTO_MIGRATE = _env_bool("BLOG_AUTO_MIGRATE", True)
+
+# Serve the routers with async def + AsyncSession instead of the threadpool
+ASYNC_DB = _env_bool("BLOG_ASYNC_DB")
+
+# Blogs embedded in GET /user/{id} unless the client asks for fewer/more
+USER_BLOGS_LIMIT = int(os.getenv("BLOG_USER_BLOGS_LIMIT", "50"))
+
+# Read-through cache of serialized GET /blog/{id} and GET /user/{id} responses ("memory" or "none")
+CACHE_BACKEND = os.getenv("BLOG_CACHE_BACKEND", "memory")
+CACHE_SIZE = int(os.getenv("BLOG_CACHE_SIZE", "10000"))
+CACHE_TTL = float(os.getenv("BLOG_CACHE_TTL", "60"))
+
+# Time every SQL statement: X-DB-Stats header, blog.sql log line, N+1 warnings
+SQL_STATS = _env_bool("BLOG_SQL_STATS")
+# Same statement this many times in one request is reported as a likely N+1
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("BLOG_SQL_N_PLUS_ONE_THRESHOLD", "5"))
+# Test mode: a request running more statements than this raises (0 disables)
+SQL_STATEMENT_BUDGET = int(os.getenv("BLOG_SQL_STATEMENT_BUDGET", "0"))
+
+# Largest array accepted by the /blog/bulk endpoints
+BULK_MAX_ITEMS = int(os.getenv("BLOG_BULK_MAX_ITEMS", "10000"))
+
+# Group commit for POST /blog: one writer inserts queued posts in a single transaction,
+# flushing every WINDOW_MS or as soon as MAX_BATCH posts are waiting
+GROUP_COMMIT = _env_bool("BLOG_GROUP_COMMIT")
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("BLOG_GROUP_COMMIT_WINDOW_MS", "5"))
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("BLOG_GROUP_COMMIT_MAX_BATCH", "100"))
+
+
+# ---------- Auth ----------
+
+# Verified JWTs kept in memory so repeat requests skip re-verification (0 disables)
+TOKEN_CACHE_SIZE = int(os.getenv("BLOG_TOKEN_CACHE_SIZE", "1024"))
+
+# Worker processes for bcrypt (0 hashes inline) and how many extra jobs may wait before 503s
+HASH_POOL_SIZE = int(os.getenv("BLOG_HASH_POOL_SIZE", "2"))
+HASH_QUEUE_DEPTH = int(os.getenv("BLOG_HASH_QUEUE_DEPTH", "16"))
+# bcrypt cost of new passwords; hashes at any other cost are redone on their next login.
+# Pick it for this hardware with `python -m blog.hashing calibrate`
+BCRYPT_ROUNDS = int(os.getenv("BLOG_BCRYPT_ROUNDS", "12"))
+
+
+# ---------- Admission control ----------
+
+# Token bucket per authenticated principal: sustained requests/second and burst size (0 disables)
+RATE_LIMIT_PER_SECOND = float(os.getenv("BLOG_RATE_LIMIT_PER_SECOND", "0"))
+RATE_LIMIT_BURST = int(os.getenv("BLOG_RATE_LIMIT_BURST", "20"))
+
+# Concurrent requests per router, e.g. "blog=32,user=16,authentication=8" (unlisted routers are unlimited)
+ROUTER_CONCURRENCY = {
+    name.strip(): int(limit)
+    for name, _, limit in (item.partition("=") for item in os.getenv("BLOG_ROUTER_CONCURRENCY", "").split(","))
+    if name.strip()
+}
+# Requests that may wait for a router slot, and how long, before getting a 503
+ADMISSION_QUEUE_DEPTH = int(os.getenv("BLOG_ADMISSION_QUEUE_DEPTH", "64"))
+ADMISSION_QUEUE_TIMEOUT_MS = float(os.getenv("BLOG_ADMISSION_QUEUE_TIMEOUT_MS", "1000"))
+
+# Shed new requests with 503 while the average DB pool checkout wait is above this (0 disables)
+SHED_POOL_WAIT_MS = float(os.getenv("BLOG_SHED_POOL_WAIT_MS", "0"))
+
+# ---------- Metrics ----------
+
+# Serve Prometheus metrics at GET /metrics (request latency, in-flight, DB pool, process)
+METRICS = _env_bool("BLOG_METRICS", True)
+
+# ---------- Profiling ----------
+
+# Install the sampling profiler middleware (off = no per-request cost at all)
+PROFILE = _env_bool("BLOG_PROFILE")
+# Requests sending `X-Profile: <token>` are profiled (empty = header disabled)
+PROFILE_TOKEN = os.getenv("BLOG_PROFILE_TOKEN", "")
+# Fraction of all requests profiled in the background, e.g. 0.001
+PROFILE_SAMPLE_RATE = float(os.getenv("BLOG_PROFILE_SAMPLE_RATE", "0"))
+# Wall time between stack samples
+PROFILE_INTERVAL_MS = float(os.getenv("BLOG_PROFILE_INTERVAL_MS", "1"))
+# Where profiles are written, and how many of the latest are kept
+PROFILE_DIR = os.getenv("BLOG_PROFILE_DIR", "./profiles")
+PROFILE_KEEP = int(os.getenv("BLOG_PROFILE_KEEP", "100"))
+
+# ---------- Tracing ----------
+
+# Trace requests: spans for dependencies, repository calls, SQL and serialization
+TRACING = _env_bool("BLOG_TRACING")
+# Head sampling: fraction of requests traced
+TRACE_SAMPLE_RATE = float(os.getenv("BLOG_TRACE_SAMPLE_RATE", "0.01"))
+# Follow the sampled flag of an incoming traceparent instead; only when every caller is trusted
+TRACE_TRUST_PARENT = _env_bool("BLOG_TRACE_TRUST_PARENT")
+# OTLP/JSON lines file, and how many finished traces may wait for the writer before being dropped
+TRACE_FILE = os.getenv("BLOG_TRACE_FILE", "./traces.jsonl")
+TRACE_QUEUE_SIZE = int(os.getenv("BLOG_TRACE_QUEUE_SIZE", "1000"))
@@ -1,11 +1,38 @@
+import itertools
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from . import admission, config, replicas, sqlite_profile
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./blog.db"
+SQLALCHEMY_DATABASE_URL = config.SQLALCHEMY_DATABASE_URL
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+
+POOL_ARGS = {
+    "pool_size": config.DB_POOL_SIZE,
+    "max_overflow": config.DB_MAX_OVERFLOW,
+    "pool_timeout": config.DB_POOL_TIMEOUT,
+    # Times every checkout, for admission control's pool-wait shedding
+    "poolclass": admission.TimedQueuePool,
+}
+ASYNC_POOL_ARGS = {**POOL_ARGS, "poolclass": admission.TimedAsyncQueuePool}
 
 # SQLite specific argument for multithreading
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+connect_args = {"check_same_thread": False} if IS_SQLITE else {}
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=connect_args, **POOL_ARGS)
+
+# Production SQLite profile, run on every new connection (config.SQLITE_PROFILE)
+SQLITE_PRAGMAS = {}
+if IS_SQLITE and config.SQLITE_PROFILE == "production":
+    SQLITE_PRAGMAS = {
+        **sqlite_profile.PRODUCTION_PRAGMAS,
+        "busy_timeout": config.SQLITE_BUSY_TIMEOUT_MS,
+        "cache_size": -config.SQLITE_CACHE_SIZE_KB,
+        "mmap_size": config.SQLITE_MMAP_SIZE,
+    }
+    sqlite_profile.install(engine, SQLITE_PRAGMAS)
 
 # Create a session factory
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
@@ -19,4 +46,96 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# ---------- Read replicas (config.REPLICA_URLS) ----------
+
+# Replicas are copies of the primary, so they get the same connect args, pool and pragmas
+replica_engines = []
+for url in config.REPLICA_URLS:
+    replica = create_engine(url, connect_args=connect_args, **POOL_ARGS)
+    if SQLITE_PRAGMAS:
+        sqlite_profile.install(replica, SQLITE_PRAGMAS)
+    replica_engines.append(replica)
+
+# Replica sessions are marked, so results read from them are never cached (see is_replica)
+ReplicaSessionLocals = [
+    sessionmaker(bind=replica, autocommit=False, autoflush=False, info={"replica": True})
+    for replica in replica_engines
+]
+_replica_sessions = itertools.cycle(ReplicaSessionLocals)
+
+def read_session_factory(request: Request):
+    """Where a read runs: the next replica (round robin), or the primary
+    when there are none or this client wrote moments ago."""
+    if not ReplicaSessionLocals or replicas.recent_writers.recent(replicas.client_key(request.scope)):
+        return SessionLocal
+    return next(_replica_sessions)
+
+# Dependency for GET routes
+def get_read_db(request: Request):
+    db = read_session_factory(request)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# ---------- Async mode (config.ASYNC_DB) ----------
+
+# Async drivers for the sync URLs we support
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+def to_async_url(url: str):
+    """Map a sync database URL to its async-driver equivalent."""
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+ASYNC_DATABASE_URL = config.ASYNC_DATABASE_URL or to_async_url(SQLALCHEMY_DATABASE_URL)
+
+async_engine = None
+AsyncSessionLocal = None
+if config.ASYNC_DB:
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **ASYNC_POOL_ARGS)
+    if SQLITE_PRAGMAS:
+        sqlite_profile.install(async_engine.sync_engine, SQLITE_PRAGMAS)
+    # Keep attributes loaded after commit: lazy refreshes are not allowed in async code
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# Async dependency, used by the async routers
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async_replica_engines = []
+AsyncReplicaSessionLocals = []
+if config.ASYNC_DB:
+    for url in config.REPLICA_URLS:
+        replica = create_async_engine(to_async_url(url), **ASYNC_POOL_ARGS)
+        if SQLITE_PRAGMAS:
+            sqlite_profile.install(replica.sync_engine, SQLITE_PRAGMAS)
+        async_replica_engines.append(replica)
+        AsyncReplicaSessionLocals.append(
+            async_sessionmaker(bind=replica, autoflush=False, expire_on_commit=False, info={"replica": True})
+        )
+_async_replica_sessions = itertools.cycle(AsyncReplicaSessionLocals)
+
+def async_read_session_factory(request: Request):
+    """Async version of read_session_factory."""
+    if not AsyncReplicaSessionLocals or replicas.recent_writers.recent(replicas.client_key(request.scope)):
+        return AsyncSessionLocal
+    return next(_async_replica_sessions)
+
+# Async dependency for GET routes
+async def get_async_read_db(request: Request):
+    async with async_read_session_factory(request)() as db:
+        yield db
+
+def is_replica(db) -> bool:
+    """Whether a (sync or async) session from get_read_db reads from a replica."""
+    return db.info.get("replica", False)
\ No newline at end of file
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from sqlalchemy import insert
+from . import cache, config, database, models, sharding
+
+logger = logging.getLogger("blog.group_commit")
+
+
+class GroupCommitWriter:
+    """Single writer thread that commits queued blog creates in batches.
+
+    SQLite has one writer at a time, so concurrent POST /blog calls otherwise
+    wait on each other's commit (and fsync). Here each call only enqueues its
+    row; the writer collects rows for up to `window` seconds or `max_batch`
+    items, inserts them with one executemany INSERT ... RETURNING and commits
+    once. Every caller then gets back its own row.
+    """
+
+    def __init__(self, window: float, max_batch: int):
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.failed_batches = 0
+        self.batch_size_max = 0
+        self.commit_time_total = 0.0
+        self.commit_time_max = 0.0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    def submit(self, title: str, body: str, user_id: int) -> Future:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="blog-group-commit", daemon=True)
+                self._thread.start()
+        future = Future()
+        self._queue.put(({"title": title, "body": body, "user_id": user_id}, time.monotonic(), future))
+        return future
+
+    def run(self, title: str, body: str, user_id: int):
+        """Blocking call, for the sync routes (they already run in the threadpool)."""
+        return self.submit(title, body, user_id).result()
+
+    async def run_async(self, title: str, body: str, user_id: int):
+        return await asyncio.wrap_future(self.submit(title, body, user_id))
+
+    def _run(self):
+        while True:
+            batch = []
+            try:
+                batch.append(self._queue.get())
+                deadline = time.monotonic() + self.window
+                while len(batch) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                self._flush(batch)
+            except Exception as exc:
+                # Keep the thread alive: a dead writer would leave every later submit() waiting forever
+                logger.exception("group commit failed outside the insert")
+                with self._lock:
+                    self.failed_batches += 1
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+
+    def _flush(self, batch: list):
+        started = time.monotonic()
+        try:
+            if sharding.shards is not None:
+                # One transaction per shard the batch touches
+                rows = sharding.shards.insert([params for params, _, _ in batch])
+            else:
+                with database.SessionLocal() as db:
+                    # ids come back in input order, so row i answers caller i
+                    rows = db.execute(
+                        insert(models.Blog).returning(
+                            models.Blog.id, models.Blog.title, models.Blog.body, sort_by_parameter_order=True
+                        ),
+                        [params for params, _, _ in batch],
+                    ).all()
+                    db.commit()
+        except Exception as exc:
+            with self._lock:
+                self.failed_batches += 1
+            for _, _, future in batch:
+                future.set_exception(exc)
+            return
+        finished = time.monotonic()
+
+        cache.invalidate_users(params["user_id"] for params, _, _ in batch)
+        with self._lock:
+            took = finished - started
+            self.batches += 1
+            self.items += len(batch)
+            self.batch_size_max = max(self.batch_size_max, len(batch))
+            self.commit_time_total += took
+            self.commit_time_max = max(self.commit_time_max, took)
+            for _, enqueued_at, _ in batch:
+                wait = started - enqueued_at
+                self.queue_wait_total += wait
+                self.queue_wait_max = max(self.queue_wait_max, wait)
+        for (_, _, future), row in zip(batch, rows):
+            future.set_result(row)
+
+    def stats(self) -> dict:
+        with self._lock:
+            batches, items = self.batches or 1, self.items or 1
+            return {
+                "window_ms": self.window * 1000,
+                "max_batch": self.max_batch,
+                "queued": self._queue.qsize(),
+                "batches": self.batches,
+                "items": self.items,
+                "failed_batches": self.failed_batches,
+                "batch_size_avg": self.items / batches,
+                "batch_size_max": self.batch_size_max,
+                "commit_seconds_total": self.commit_time_total,
+                "commit_seconds_avg": self.commit_time_total / batches,
+                "commit_seconds_max": self.commit_time_max,
+                "queue_wait_seconds_avg": self.queue_wait_total / items,
+                "queue_wait_seconds_max": self.queue_wait_max,
+            }
+
+
+# Off by default: POST /blog commits its own row (config.GROUP_COMMIT)
+writer = None
+if config.GROUP_COMMIT:
+    writer = GroupCommitWriter(config.GROUP_COMMIT_WINDOW_MS / 1000, config.GROUP_COMMIT_MAX_BATCH)
@@ -1,15 +1,276 @@
+import argparse
+import asyncio
+import multiprocessing
+import statistics
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
+from passlib.hash import bcrypt
+from . import config
+
+# Initialize password hashing context using bcrypt. min = max = default marks a
+# hash at any other cost as needing an update, so verify_and_update() redoes it.
+pwd_cxt = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=config.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=config.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=config.BCRYPT_ROUNDS,
+)
+
+# Never recommend less, however slow the host (OWASP's floor for bcrypt)
+MIN_CALIBRATED_ROUNDS = 10
+
+
+def _timed(op: str, *args):
+    """Runs inside a pool worker: do the bcrypt work and report when it ran.
+
+    `op` is a CryptContext method: hash, verify or verify_and_update.
+    """
+    started = time.time()
+    result = getattr(pwd_cxt, op)(*args)
+    return result, started, time.time()
+
+
+class HashPool:
+    """Process pool that keeps bcrypt (CPU + GIL heavy) off the request workers.
+
+    At most `size + queue_depth` jobs are in flight; anything beyond that is
+    shed with a 503 instead of queueing behind a login storm.
+    """
+
+    def __init__(self, size: int, queue_depth: int):
+        self.size = size
+        self.queue_depth = queue_depth
+        self._executor = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.restarts = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.hash_time_total = 0.0
+        self.hash_time_max = 0.0
+
+    def submit(self, op: str, *args):
+        with self._lock:
+            if self.in_flight >= self.size + self.queue_depth:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many password operations in progress, please retry",
+                    headers={"Retry-After": "1"},
+                )
+            self.in_flight += 1
+            self.submitted += 1
+
+        submitted_at = time.time()
+        try:
+            future = self._submit(op, args)
+        except BaseException:
+            with self._lock:
+                self.in_flight -= 1
+            raise
+        future.add_done_callback(lambda f: self._done(f, submitted_at))
+        return future
+
+    def _submit(self, op: str, args: tuple):
+        # A dead worker (e.g. OOM-killed) breaks the executor for good: replace it and retry once
+        for attempt in range(2):
+            with self._lock:
+                if self._executor is None:
+                    # spawn: forking a process that already runs server threads is unsafe
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.size, mp_context=multiprocessing.get_context("spawn")
+                    )
+                executor = self._executor
+            try:
+                return executor.submit(_timed, op, *args)
+            except BrokenProcessPool:
+                with self._lock:
+                    if self._executor is executor:
+                        self._executor = None
+                        self.restarts += 1
+                executor.shutdown(wait=False)
+                if attempt:
+                    raise
+
+    def _done(self, future, submitted_at: float):
+        with self._lock:
+            self.in_flight -= 1
+            if future.cancelled() or future.exception() is not None:
+                return
+            _, started, finished = future.result()
+            wait, took = max(started - submitted_at, 0.0), finished - started
+            self.completed += 1
+            self.queue_wait_total += wait
+            self.queue_wait_max = max(self.queue_wait_max, wait)
+            self.hash_time_total += took
+            self.hash_time_max = max(self.hash_time_max, took)
+
+    def run(self, op: str, *args):
+        """Blocking call, for the sync routes (they already run in the threadpool)."""
+        return self.submit(op, *args).result()[0]
+
+    async def run_async(self, op: str, *args):
+        return (await asyncio.wrap_future(self.submit(op, *args)))[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self.completed or 1
+            return {
+                "pool_size": self.size,
+                "queue_depth_limit": self.queue_depth,
+                "in_flight": self.in_flight,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "restarts": self.restarts,
+                "queue_wait_seconds_total": self.queue_wait_total,
+                "queue_wait_seconds_avg": self.queue_wait_total / completed,
+                "queue_wait_seconds_max": self.queue_wait_max,
+                "hash_seconds_total": self.hash_time_total,
+                "hash_seconds_avg": self.hash_time_total / completed,
+                "hash_seconds_max": self.hash_time_max,
+            }
+
+
+# BLOG_HASH_POOL_SIZE=0 keeps hashing inline on the calling thread
+pool = HashPool(config.HASH_POOL_SIZE, config.HASH_QUEUE_DEPTH) if config.HASH_POOL_SIZE > 0 else None
 
-# Initialize password hashing context using bcrypt
-pwd_cxt = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 class Hash:
     @staticmethod
     def bcrypt(password: str):
         """Hash a plain password using bcrypt algorithm."""
-        return pwd_cxt.hash(password)
+        if pool is None:
+            return pwd_cxt.hash(password)
+        return pool.run("hash", password)
 
     @staticmethod
     def verify(plain_password: str, hashed_password: str):
         """Verify a plain password against its hashed version."""
-        return pwd_cxt.verify(plain_password, hashed_password)
+        if pool is None:
+            return pwd_cxt.verify(plain_password, hashed_password)
+        return pool.run("verify", plain_password, hashed_password)
+
+    @staticmethod
+    def verify_and_update(plain_password: str, hashed_password: str):
+        """(verified, new hash or None): a new hash when the stored one is not at config.BCRYPT_ROUNDS."""
+        if pool is None:
+            return pwd_cxt.verify_and_update(plain_password, hashed_password)
+        return pool.run("verify_and_update", plain_password, hashed_password)
+
+    @staticmethod
+    async def bcrypt_async(password: str):
+        """Async variant of bcrypt() for the async routers."""
+        if pool is None:
+            return await asyncio.to_thread(pwd_cxt.hash, password)
+        return await pool.run_async("hash", password)
+
+    @staticmethod
+    async def verify_async(plain_password: str, hashed_password: str):
+        """Async variant of verify() for the async routers."""
+        if pool is None:
+            return await asyncio.to_thread(pwd_cxt.verify, plain_password, hashed_password)
+        return await pool.run_async("verify", plain_password, hashed_password)
+
+    @staticmethod
+    async def verify_and_update_async(plain_password: str, hashed_password: str):
+        """Async variant of verify_and_update() for the async routers."""
+        if pool is None:
+            return await asyncio.to_thread(pwd_cxt.verify_and_update, plain_password, hashed_password)
+        return await pool.run_async("verify_and_update", plain_password, hashed_password)
+
+
+# ---------- Cost calibration and report ----------
+
+def cost_of(hashed_password: str):
+    """bcrypt cost of a stored hash ("$2b$12$..." -> 12), None if it is not bcrypt."""
+    parts = hashed_password.split("$")
+    if len(parts) >= 4 and parts[1].startswith("2") and parts[2].isdigit():
+        return int(parts[2])
+    return None
+
+
+def time_verify(rounds: int, samples: int = 3) -> float:
+    """Median seconds to verify a password hashed at `rounds` on this host."""
+    hashed = bcrypt.using(rounds=rounds).hash("calibration password")
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        bcrypt.verify("calibration password", hashed)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def calibrate(target_ms: float, samples: int = 3) -> tuple:
+    """(recommended rounds, {rounds: verify ms}): the highest cost that verifies within target_ms.
+
+    Each extra round doubles the time, so timing stops at the first cost over the target.
+    """
+    timings = {}
+    rounds = 4
+    while rounds <= 31:
+        timings[rounds] = time_verify(rounds, samples) * 1000
+        if timings[rounds] > target_ms:
+            break
+        rounds += 1
+    within = [r for r, ms in timings.items() if ms <= target_ms]
+    return max([*within, MIN_CALIBRATED_ROUNDS]), timings
+
+
+def cost_distribution(engine) -> dict:
+    """{cost: users} over the users table; None counts passwords that are not bcrypt hashes."""
+    from sqlalchemy import func, select
+    from . import models
+
+    # "$2b$12$" holds the cost; grouping on it avoids reading every hash into Python
+    prefix = func.substr(models.User.password, 1, 7)
+    counts = {}
+    with engine.connect() as conn:
+        for value, count in conn.execute(select(prefix, func.count()).group_by(prefix)):
+            cost = cost_of(value) if value else None
+            counts[cost] = counts.get(cost, 0) + count
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bcrypt cost calibration and report")
+    parser.add_argument("command", choices=["calibrate", "costs"])
+    parser.add_argument("--target-ms", type=float, default=250, help="calibrate: verify time to aim for")
+    parser.add_argument("--samples", type=int, default=3, help="calibrate: timings per cost (median is used)")
+    parser.add_argument("--url", help="costs: database URL (defaults to BLOG_DATABASE_URL)")
+    args = parser.parse_args()
+
+    if args.command == "calibrate":
+        rounds, timings = calibrate(args.target_ms, args.samples)
+        for cost, ms in timings.items():
+            marker = "  <- current" if cost == config.BCRYPT_ROUNDS else ""
+            print(f"cost {cost:>2}: {ms:>9.1f} ms{marker}")
+        if timings.get(rounds, float("inf")) <= args.target_ms:
+            print(f"Highest cost within {args.target_ms:.0f} ms: {rounds}")
+        else:
+            print(f"No cost from {MIN_CALIBRATED_ROUNDS} up verifies within {args.target_ms:.0f} ms; "
+                  f"using the floor, {rounds}")
+        print(f"Now set BLOG_BCRYPT_ROUNDS={rounds}; existing hashes are redone on their next login")
+        return
+
+    from sqlalchemy import create_engine
+    engine = create_engine(args.url or config.SQLALCHEMY_DATABASE_URL)
+    counts = cost_distribution(engine)
+    total = sum(counts.values())
+    for cost in sorted(counts, key=lambda c: (c is None, c)):
+        label = f"cost {cost}" if cost is not None else "not bcrypt"
+        marker = "" if cost == config.BCRYPT_ROUNDS else "  (rehashed on next login)"
+        print(f"{label:<12}{counts[cost]:>10} users {counts[cost] / total:>7.1%}{marker}")
+    print(f"{total} users, target cost {config.BCRYPT_ROUNDS} (BLOG_BCRYPT_ROUNDS)")
+
+
+if __name__ == "__main__":
+    main()
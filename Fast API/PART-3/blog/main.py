@@ -1,13 +1,52 @@
 from fastapi import FastAPI
-from . import models
-from .database import engine
-from .routers import blog, user, authentication
+from . import config, database, metrics, migrations, profiling, replicas, sharding, sqlstats, sqlite_profile, tracing
+from .database import engine, SQLITE_PRAGMAS
+from .routers import stats
+
+# Async routers + AsyncSession when configured, the sync ones otherwise
+if config.ASYNC_DB:
+    from .routers import blog_async as blog, user_async as user, authentication_async as authentication
+else:
+    from .routers import blog, user, authentication
 
 app = FastAPI()
 
-# Create database tables (if they don't already exist)
-models.Base.metadata.create_all(engine)
+if config.SQL_STATS or config.SQL_STATEMENT_BUDGET:
+    sqlstats.instrument_app_engines()
+    app.add_middleware(sqlstats.SQLStatsMiddleware)
+
+# Remember who just wrote, so their next reads skip the (possibly lagging) replicas
+if config.REPLICA_URLS:
+    app.add_middleware(replicas.ReadYourWritesMiddleware)
+
+# Spans for head-sampled requests, written to config.TRACE_FILE
+if config.TRACING:
+    tracing.instrument_app()
+    app.add_middleware(tracing.TracingMiddleware)
+
+# X-Profile and background-sampled requests (zero cost when off)
+if config.PROFILE:
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+# Added last, so its timings include the middlewares above
+if config.METRICS:
+    pools = {"primary": database.async_engine if config.ASYNC_DB else engine}
+    replica_engines = database.async_replica_engines if config.ASYNC_DB else database.replica_engines
+    pools.update((f"replica{i}", replica) for i, replica in enumerate(replica_engines))
+    if sharding.shards is not None:
+        pools.update((f"shard{i}", shard) for i, shard in enumerate(sharding.shards.engines))
+    metrics.install(app, engines=pools)
+
+# Check the schema version (and apply pending migrations if allowed)
+migrations.check(engine, config.AUTO_MIGRATE)
+if sharding.shards is not None:
+    sharding.shards.check(config.AUTO_MIGRATE)
+
+# Log which SQLite settings actually took effect
+if SQLITE_PRAGMAS:
+    sqlite_profile.report(engine, SQLITE_PRAGMAS)
 
 app.include_router(authentication.router)
 app.include_router(blog.router)
-app.include_router(user.router)
\ No newline at end of file
+app.include_router(user.router)
+app.include_router(stats.router)
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""Prometheus metrics for a FastAPI app, with no dependencies beyond FastAPI.
+
+    metrics.install(app, engines={"primary": engine})
+
+adds a middleware that times every request and a GET /metrics endpoint in
+the Prometheus text format:
+
+- http_request_duration_seconds  histogram by method, route template and status
+- http_requests_in_flight        gauge
+- db_pool_checkout_seconds       histogram of connection checkout time, recorded
+                                 by admission's timed pools (observe_checkout)
+- db_pool_connections            gauge by pool and state (checked_out, idle, overflow, size)
+- process_cpu_seconds_total, process_resident_memory_bytes
+
+Request metrics are only touched from the event loop, so recording is a few
+dict and list operations with no lock.
+"""
+import bisect
+import os
+import threading
+import time
+from fastapi.responses import PlainTextResponse
+
+# Seconds; the usual Prometheus client defaults
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+CHECKOUT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Requests that matched no route share one label, so scanners cannot grow the label set
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, label_names: tuple, buckets: tuple):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, labels: tuple, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in list(self._series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class LockedHistogram(Histogram):
+    """Histogram observed from several threads (e.g. DB pool checkouts in the threadpool)."""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        with self._lock:
+            super().observe(labels, value)
+
+    def render(self) -> list:
+        with self._lock:
+            return super().render()
+
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Time from request start to the end of the response.",
+    ("method", "route", "status"), LATENCY_BUCKETS,
+)
+pool_checkout = LockedHistogram(
+    "db_pool_checkout_seconds", "Time to get a connection from a DB pool, including waiting for one.",
+    (), CHECKOUT_BUCKETS,
+)
+in_flight = 0
+
+# name -> engine, read at scrape time
+_engines = {}
+
+
+def observe_checkout(seconds: float):
+    pool_checkout.observe((), seconds)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request_duration and in_flight."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global in_flight
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500  # if the app fails before starting a response
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight -= 1
+            route = scope.get("route")
+            template = getattr(route, "path", None) or UNMATCHED_ROUTE
+            request_duration.observe((scope["method"], template, status), time.perf_counter() - started)
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0
+    # No /proc (macOS): peak rather than current RSS, reported in bytes there
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _pool_lines() -> list:
+    lines = ["# HELP db_pool_connections DB pool connections by state.", "# TYPE db_pool_connections gauge"]
+    for name, engine in _engines.items():
+        pool = getattr(engine, "sync_engine", engine).pool
+        states = {}
+        for state, method in (("size", "size"), ("checked_out", "checkedout"), ("idle", "checkedin"),
+                              ("overflow", "overflow")):
+            if hasattr(pool, method):
+                # QueuePool.overflow() counts up from -pool_size
+                states[state] = max(0, getattr(pool, method)())
+        for state, value in states.items():
+            lines.append(f'db_pool_connections{{pool="{_escape(name)}",state="{state}"}} {value}')
+    return lines
+
+
+def render() -> str:
+    cpu = os.times()
+    lines = [
+        "# HELP http_requests_in_flight Requests being served.",
+        "# TYPE http_requests_in_flight gauge",
+        f"http_requests_in_flight {in_flight}",
+        *request_duration.render(),
+        *pool_checkout.render(),
+        *(_pool_lines() if _engines else []),
+        "# HELP process_cpu_seconds_total User and system CPU time of this process.",
+        "# TYPE process_cpu_seconds_total counter",
+        f"process_cpu_seconds_total {cpu.user + cpu.system}",
+        "# HELP process_resident_memory_bytes Resident memory size.",
+        "# TYPE process_resident_memory_bytes gauge",
+        f"process_resident_memory_bytes {_rss_bytes()}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def install(app, engines: dict = None, path: str = "/metrics"):
+    """Add the middleware and the scrape endpoint to `app`; `engines` maps pool label -> Engine."""
+    _engines.update(engines or {})
+    app.add_middleware(MetricsMiddleware)
+
+    # async: renders on the event loop, where the request metrics are written
+    @app.get(path, include_in_schema=False)
+    async def scrape():
+        return PlainTextResponse(render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,198 @@
+"""Versioned schema migrations for the blog database.
+
+Applied versions are recorded in the `schema_migrations` table. Existing
+blog.db files are upgraded in place:
+
+    python -m blog.migrations status
+    python -m blog.migrations upgrade
+
+At startup blog.main only checks the recorded version (one SELECT) and
+either applies pending migrations (BLOG_AUTO_MIGRATE=1, the default) or
+refuses to start. Every uvicorn worker runs that check, so each migration is
+applied under the database write lock after re-reading the version: workers
+starting together take turns, and only the first applies anything.
+"""
+import argparse
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from sqlalchemy import (Column, ForeignKey, Integer, MetaData, String, Table,
+                        create_engine, inspect, insert, select, func, text)
+from . import compression, search
+
+logger = logging.getLogger("blog.migrations")
+
+
+class MigrationError(RuntimeError):
+    pass
+
+
+# How long a worker waits for another one's migration before giving up
+LOCK_TIMEOUT_MS = 10 * 60 * 1000
+# pg_advisory_xact_lock key shared by every process migrating the same database
+_PG_LOCK_KEY = 0x626C6F67
+
+
+# Migration 1 creates the schema as it was before migrations existed. It is
+# frozen here rather than taken from models.py so later migrations stay valid.
+_baseline = MetaData()
+Table(
+    "users", _baseline,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String),
+    Column("email", String),
+    Column("password", String),
+)
+Table(
+    "blogs", _baseline,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("title", String),
+    Column("body", String),
+    Column("user_id", Integer, ForeignKey("users.id")),
+)
+
+_versions = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _versions,
+    Column("version", Integer, primary_key=True),
+    Column("description", String),
+    Column("applied_at", String),
+)
+
+
+def _baseline_tables(conn):
+    # No-op on blog.db files created by the old create_all()
+    _baseline.create_all(conn, checkfirst=True)
+
+
+def _email_and_user_id_indexes(conn):
+    duplicates = conn.execute(text(
+        "SELECT email, count(*) FROM users GROUP BY email HAVING count(*) > 1"
+    )).all()
+    if duplicates:
+        raise MigrationError(
+            f"Cannot add a unique index on users.email, duplicates exist: {[row[0] for row in duplicates]}"
+        )
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email ON users (email)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_blogs_user_id ON blogs (user_id)"))
+
+
+def _blogs_fts(conn):
+    if conn.dialect.name == "sqlite":
+        search.install(conn)
+
+
+def _compressed_bodies(conn):
+    if conn.dialect.name != "sqlite":
+        return
+    # Re-index once at the end instead of through the update trigger row by row
+    search.uninstall(conn)
+    last_id = 0
+    while True:
+        rows = conn.execute(text(
+            "SELECT id, body FROM blogs WHERE id > :last_id AND typeof(body) = 'text' ORDER BY id LIMIT 1000"
+        ), {"last_id": last_id}).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        packed = [{"id": row.id, "body": compression.compress(row.body)} for row in rows]
+        packed = [row for row in packed if isinstance(row["body"], bytes)]
+        if packed:
+            conn.execute(text("UPDATE blogs SET body = :body WHERE id = :id"), packed)
+    search.install(conn)
+
+
+# (version, description, upgrade function); append only, never edit a shipped entry
+MIGRATIONS = [
+    (1, "baseline users and blogs tables", _baseline_tables),
+    (2, "unique index on users.email, index on blogs.user_id", _email_and_user_id_indexes),
+    (3, "FTS5 index over blogs.title/body (SQLite only)", _blogs_fts),
+    (4, "compress long blogs.body values, FTS reads them through blog_body() (SQLite only)", _compressed_bodies),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn) -> int:
+    if not inspect(conn).has_table("schema_migrations"):
+        return 0
+    return conn.execute(select(func.max(schema_migrations.c.version))).scalar() or 0
+
+
+@contextmanager
+def _write_locked(engine):
+    """A transaction that holds the database write lock from its first statement."""
+    if engine.dialect.name != "sqlite":
+        with engine.begin() as conn:
+            if engine.dialect.name == "postgresql":
+                conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _PG_LOCK_KEY})
+            yield conn
+        return
+
+    # pysqlite would open a deferred transaction on the first write; BEGIN IMMEDIATE
+    # takes the write lock before the version is read
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT")
+        busy_timeout = conn.exec_driver_sql("PRAGMA busy_timeout").scalar()
+        conn.exec_driver_sql(f"PRAGMA busy_timeout={LOCK_TIMEOUT_MS}")
+        try:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.exec_driver_sql("ROLLBACK")
+                raise
+            conn.exec_driver_sql("COMMIT")
+        finally:
+            conn.exec_driver_sql(f"PRAGMA busy_timeout={busy_timeout}")
+
+
+def upgrade(engine) -> list:
+    """Apply every pending migration, each in its own write-locked transaction."""
+    applied = []
+    for number, description, fn in MIGRATIONS:
+        with _write_locked(engine) as conn:
+            _versions.create_all(conn, checkfirst=True)
+            if current_version(conn) >= number:
+                continue  # applied earlier, or by a worker that held the lock before us
+            logger.info("Applying migration %d: %s", number, description)
+            fn(conn)
+            conn.execute(insert(schema_migrations).values(
+                version=number, description=description,
+                applied_at=datetime.now(timezone.utc).isoformat(),
+            ))
+        applied.append(number)
+    return applied
+
+
+def check(engine, auto_migrate: bool):
+    """Startup check: cheap when the schema is current."""
+    with engine.connect() as conn:
+        version = current_version(conn)
+    if version == LATEST_VERSION:
+        return
+    if version > LATEST_VERSION:
+        raise MigrationError(f"Database schema version {version} is newer than this code ({LATEST_VERSION})")
+    if not auto_migrate:
+        raise MigrationError(
+            f"Database schema version {version} is behind {LATEST_VERSION}; run `python -m blog.migrations upgrade`"
+        )
+    upgrade(engine)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Blog database schema migrations")
+    parser.add_argument("command", choices=["status", "upgrade"])
+    parser.add_argument("--url", help="database URL (defaults to BLOG_DATABASE_URL)")
+    args = parser.parse_args()
+
+    from . import config
+    engine = create_engine(args.url or config.SQLALCHEMY_DATABASE_URL)
+    if args.command == "upgrade":
+        applied = upgrade(engine)
+        print(f"Applied migrations: {applied}" if applied else "Already up to date")
+    with engine.connect() as conn:
+        print(f"Schema version {current_version(conn)} (latest {LATEST_VERSION})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,16 @@
 from sqlalchemy import Column, Integer, String, ForeignKey
+from .compression import CompressedText
 from .database import Base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 
 # ORM model for 'blogs' table
 class Blog(Base):
     __tablename__ = 'blogs'
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String)
-    body = Column(String)
-    user_id = Column(Integer, ForeignKey('users.id'))
+    # Long and possibly compressed: ORM loads of Blog skip it unless a query asks for it
+    body = deferred(Column(CompressedText))
+    user_id = Column(Integer, ForeignKey('users.id'), index=True)
 
     creator = relationship("User", back_populates="blogs")
 
@@ -18,7 +20,7 @@ class User(Base):
 
     id = Column(Integer, primary_key = True, index = True)
     name = Column(String)
-    email = Column(String)
+    email = Column(String, unique=True, index=True)
     password = Column(String)
 
     blogs = relationship('Blog', back_populates = "creator")
\ No newline at end of file
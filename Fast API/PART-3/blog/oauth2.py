@@ -1,14 +1,19 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from . import token
+from . import admission, token, schemas, tracing
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
-def get_current_user(data: str = Depends(oauth2_scheme)):
+# async: verification is CPU-only (and usually a cache hit), so skip the threadpool hop
+async def get_current_user(data: str = Depends(oauth2_scheme)) -> schemas.Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    return token.verify_token(data, credentials_exception)
\ No newline at end of file
+    with tracing.span("oauth2.get_current_user"):
+        principal = token.verify_token(data, credentials_exception)
+        # Per-principal token bucket (429 when empty)
+        admission.check_rate(principal)
+    return principal
\ No newline at end of file
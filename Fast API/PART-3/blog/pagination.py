@@ -0,0 +1,64 @@
+import base64
+import json
+from typing import Optional, Tuple
+from fastapi import HTTPException, Request, Response, status
+
+# Page size used when the client does not pass ?limit=
+DEFAULT_PAGE_SIZE = 100
+# Upper bound so a single page can never pull the whole table
+MAX_PAGE_SIZE = 1000
+# Rows fetched from the server-side cursor per NDJSON chunk
+STREAM_CHUNK_SIZE = 500
+
+
+def _encode(payload: dict) -> str:
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(payload, dict) or not isinstance(payload.get("id"), int):
+            raise ValueError(payload)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+    return payload
+
+
+def encode_cursor(last_id: int) -> str:
+    """Turn the last seen blog id into an opaque, URL-safe cursor."""
+    return _encode({"id": last_id})
+
+
+def decode_cursor(cursor: str) -> int:
+    """Turn a cursor produced by encode_cursor back into a blog id."""
+    return _decode(cursor)["id"]
+
+
+def encode_rank_cursor(rank: float, last_id: int) -> str:
+    """Cursor for result lists ordered by (rank, id), e.g. search hits."""
+    return _encode({"rank": rank, "id": last_id})
+
+
+def decode_rank_cursor(cursor: str) -> Tuple[float, int]:
+    payload = _decode(cursor)
+    if not isinstance(payload.get("rank"), (int, float)):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+    return payload["rank"], payload["id"]
+
+
+def set_next_link(request: Request, response: Response, limit: int, cursor: Optional[str]):
+    """Advertise the next page in the Link and X-Next-Cursor headers."""
+    if cursor is None:
+        return
+    next_url = request.url.include_query_params(limit=limit, after=cursor)
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
+    response.headers["X-Next-Cursor"] = cursor
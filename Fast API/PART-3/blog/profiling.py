@@ -0,0 +1,244 @@
+"""On-demand sampling profiler for single requests (config.PROFILE).
+
+A request is profiled when it carries `X-Profile: <config.PROFILE_TOKEN>`,
+or at random for config.PROFILE_SAMPLE_RATE of all traffic. While it runs, a
+background thread takes a stack sample every PROFILE_INTERVAL_MS of wall time:
+
+- from the event loop thread, when the request's own task is the one running
+  (async routes, dependencies, middlewares, response rendering);
+- from any other thread that is running this app's code, i.e. the threadpool
+  serving a sync route. Another request served by the threadpool at the same
+  moment lands in the same profile, so profile on a quiet worker if you can.
+
+The samples are written to PROFILE_DIR/<id>.folded as collapsed stacks
+(`frame;frame;frame count`), the input of flamegraph.pl, speedscope and
+inferno. A triggered response carries `X-Profile-Id`; recent profiles are
+listed at GET /stats/profiles and served at GET /stats/profiles/{id}, to
+requests carrying the same X-Profile token.
+
+With config.PROFILE off, the middleware is not installed at all.
+"""
+import asyncio
+import hmac
+import logging
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, deque
+from . import config
+
+logger = logging.getLogger("blog.profile")
+
+# Frames from files under this directory mark a thread as serving the app
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_PACKAGE_ROOT = os.path.dirname(APP_DIR) + os.sep
+
+_labels = {}  # code object -> frame label
+
+
+def _label(code) -> str:
+    label = _labels.get(code)
+    if label is None:
+        path = code.co_filename
+        if path.startswith(_PACKAGE_ROOT):
+            path = path[len(_PACKAGE_ROOT):]
+        elif "site-packages" + os.sep in path:
+            path = path.split("site-packages" + os.sep, 1)[1]
+        else:
+            path = os.path.basename(path)
+        label = _labels[code] = f"{code.co_name} ({path}:{code.co_firstlineno})"
+    return label
+
+
+def _stack(frame) -> list:
+    """Code objects from the outermost frame to `frame`."""
+    codes = []
+    while frame is not None:
+        codes.append(frame.f_code)
+        frame = frame.f_back
+    codes.reverse()
+    return codes
+
+
+class Profile:
+    """Samples of one request."""
+
+    def __init__(self, id: str, method: str, path: str, trigger: str):
+        self.id = id
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        self.loop_thread = threading.get_ident()
+        self.samples = Counter()  # (root, *code objects) -> count
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+        self.status = None
+
+    def sample(self, frames: dict, sampler_thread: int):
+        for ident, frame in frames.items():
+            if ident == sampler_thread:
+                continue
+            if ident == self.loop_thread:
+                # The loop interleaves requests; only count it while this one runs
+                if asyncio.current_task(self.loop) is self.task:
+                    self.samples[("loop", *_stack(frame))] += 1
+                continue
+            stack = _stack(frame)
+            if any(code.co_filename.startswith(APP_DIR) for code in stack):
+                self.samples[("threadpool", *stack)] += 1
+
+    def folded(self) -> str:
+        return "".join(
+            ";".join([root, *map(_label, codes)]) + f" {count}\n"
+            for (root, *codes), count in self.samples.most_common()
+        )
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "trigger": self.trigger,
+            "duration_ms": self.seconds * 1000,
+            "samples": sum(self.samples.values()),
+        }
+
+
+class Sampler:
+    """One background thread sampling every active Profile; it exits when none are left.
+
+    While it runs, the interpreter's GIL switch interval (5 ms by default) is
+    lowered to the sample interval; otherwise a busy request thread would only
+    let the sampler in every 5 ms.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._active = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._switch_interval = None
+
+    def start(self, profile: Profile):
+        with self._lock:
+            self._active.add(profile)
+            if self._thread is None:
+                self._switch_interval = sys.getswitchinterval()
+                sys.setswitchinterval(min(self._switch_interval, self.interval))
+                self._thread = threading.Thread(target=self._run, name="blog-profiler", daemon=True)
+                self._thread.start()
+
+    def stop(self, profile: Profile):
+        with self._lock:
+            self._active.discard(profile)
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            # Sample under the lock, so a stopped profile is never written to again
+            with self._lock:
+                if not self._active:
+                    sys.setswitchinterval(self._switch_interval)
+                    self._thread = None
+                    return
+                frames = sys._current_frames()
+                for profile in self._active:
+                    profile.sample(frames, me)
+                del frames
+            time.sleep(self.interval)
+
+
+sampler = Sampler(config.PROFILE_INTERVAL_MS / 1000)
+
+# Most recent profiles, oldest first; their files are deleted as they drop out.
+# _store runs in worker threads, so changes and reads go through _recent_lock.
+recent = deque()
+_recent_lock = threading.Lock()
+
+
+def path_of(id: str) -> str:
+    return os.path.join(config.PROFILE_DIR, f"{id}.folded")
+
+
+def _store(profile: Profile):
+    """Write the profile and drop the oldest ones; blocking file I/O, run off the event loop."""
+    os.makedirs(config.PROFILE_DIR, exist_ok=True)
+    with open(path_of(profile.id), "w") as out:
+        out.write(profile.folded())
+    with _recent_lock:
+        recent.append(profile.summary())
+        dropped = [recent.popleft() for _ in range(len(recent) - config.PROFILE_KEEP)]
+    for old in dropped:
+        try:
+            os.remove(path_of(old["id"]))
+        except OSError:
+            pass
+
+
+def listing() -> list:
+    """Summaries of the recent profiles, newest first."""
+    with _recent_lock:
+        return list(reversed(recent))
+
+
+def find(id: str):
+    """Summary of a recent profile, or None (also for ids that are not ours)."""
+    with _recent_lock:
+        return next((summary for summary in recent if summary["id"] == id), None)
+
+
+def authorized(scope) -> bool:
+    """Whether the request carries X-Profile with config.PROFILE_TOKEN (never, without a token)."""
+    if not config.PROFILE_TOKEN:
+        return False
+    for name, value in scope["headers"]:
+        if name == b"x-profile":
+            return hmac.compare_digest(value, config.PROFILE_TOKEN.encode())
+    return False
+
+
+class ProfilingMiddleware:
+    """ASGI middleware: samples requests asked for with X-Profile, plus a random fraction."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        if authorized(scope):
+            trigger = "header"
+        elif config.PROFILE_SAMPLE_RATE and random.random() < config.PROFILE_SAMPLE_RATE:
+            trigger = "sampled"
+        else:
+            return await self.app(scope, receive, send)
+
+        profile = Profile(secrets.token_hex(8), scope["method"], scope["path"], trigger)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                if trigger == "header":
+                    message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        sampler.start(profile)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.stop(profile)
+            profile.seconds = time.perf_counter() - profile.started
+            try:
+                await asyncio.to_thread(_store, profile)
+            except OSError:
+                logger.exception("could not store profile %s", profile.id)
+            else:
+                logger.info("profiled %s %s (%s): %.1f ms, %d samples, id %s", profile.method, profile.path,
+                            trigger, profile.seconds * 1000, sum(profile.samples.values()), profile.id)
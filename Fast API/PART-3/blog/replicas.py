@@ -0,0 +1,108 @@
+"""Read-your-writes tracking for the read replicas (config.REPLICA_URLS).
+
+GET routes read from a replica (database.get_read_db), except for a client
+that wrote within the last READ_YOUR_WRITES_SECONDS: replicas may lag, so
+that client keeps reading from the primary until the window passes. A client
+is its Authorization header, or its address when it sends none.
+
+SQLite file copies work as local replicas. Refresh them from the primary
+(online, with the SQLite backup API) with:
+
+    python -m blog.replicas sync
+"""
+import argparse
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy.engine import make_url
+from . import config
+
+# Requests that never count as writes
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class RecentWriters:
+    """Clients that wrote in the last `window` seconds, at most `maxsize` of them."""
+
+    def __init__(self, window: float, maxsize: int = 100_000):
+        self.window = window
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # client -> primary-until (monotonic), oldest first
+        self._lock = threading.Lock()
+
+    def mark(self, client: str):
+        now = time.monotonic()
+        with self._lock:
+            self._entries.pop(client, None)
+            self._entries[client] = now + self.window
+            # Same window for everyone, so the front is always the first to expire
+            while self._entries and (len(self._entries) > self.maxsize or next(iter(self._entries.values())) <= now):
+                self._entries.popitem(last=False)
+
+    def recent(self, client: str) -> bool:
+        with self._lock:
+            until = self._entries.get(client)
+        return until is not None and until > time.monotonic()
+
+
+recent_writers = RecentWriters(config.READ_YOUR_WRITES_SECONDS)
+
+
+def client_key(scope) -> str:
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            return value.decode("latin-1")
+    client = scope.get("client")
+    return client[0] if client else ""
+
+
+class ReadYourWritesMiddleware:
+    """ASGI middleware: remembers clients whose write requests succeeded."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in READ_METHODS:
+            return await self.app(scope, receive, send)
+
+        async def send_and_mark(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                recent_writers.mark(client_key(scope))
+            await send(message)
+
+        await self.app(scope, receive, send_and_mark)
+
+
+def sync(primary_url: str, replica_urls: list, pages_per_step: int = 1024):
+    """Copy a SQLite primary onto SQLite replica files without stopping writers."""
+    source = sqlite3.connect(make_url(primary_url).database)
+    try:
+        for url in replica_urls:
+            target = sqlite3.connect(make_url(url).database)
+            try:
+                started = time.perf_counter()
+                source.backup(target, pages=pages_per_step)
+                print(f"Synced {url} in {time.perf_counter() - started:.2f}s")
+            finally:
+                target.close()
+    finally:
+        source.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage SQLite read replicas of the blog database")
+    parser.add_argument("command", choices=["sync"])
+    args = parser.parse_args()
+
+    if not config.REPLICA_URLS:
+        parser.error("BLOG_REPLICA_URLS is not set")
+    urls = [config.SQLALCHEMY_DATABASE_URL, *config.REPLICA_URLS]
+    if not all(make_url(url).get_backend_name() == "sqlite" for url in urls):
+        parser.error("sync only copies SQLite files; use the database's own replication otherwise")
+    sync(config.SQLALCHEMY_DATABASE_URL, config.REPLICA_URLS)
+
+
+if __name__ == "__main__":
+    main()
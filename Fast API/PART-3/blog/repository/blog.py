@@ -1,65 +1,218 @@
+import json
+from typing import List, Optional
+from sqlalchemy import select, insert, update as sql_update, delete as sql_delete
 from sqlalchemy.orm import Session
-from .. import models, schemas
+from .. import models, schemas, database, cache, search as fts, config, group_commit, sharding
+from ..pagination import DEFAULT_PAGE_SIZE, STREAM_CHUNK_SIZE, encode_cursor, encode_rank_cursor
 from fastapi import HTTPException, status
 
-def get_all(db: Session):
-    blogs = db.query(models.Blog).all()
-    return blogs
+def get_all(db: Session, limit: int = DEFAULT_PAGE_SIZE, after: Optional[int] = None):
+    # Keyset pagination: walk the primary key instead of using OFFSET,
+    # so every page costs the same no matter how deep the client is.
+    # Plain Core rows: the page is serialized straight from them (see serialization.py)
+    # Fetch one extra row to know whether another page exists
+    if sharding.shards is not None:
+        blogs = sharding.shards.page(limit + 1, after)
+    else:
+        stmt = select(models.Blog.id, models.Blog.title, models.Blog.body).order_by(models.Blog.id)
+        if after is not None:
+            stmt = stmt.where(models.Blog.id > after)
+        blogs = db.execute(stmt.limit(limit + 1)).all()
+    next_cursor = encode_cursor(blogs[limit - 1].id) if len(blogs) > limit else None
+    return blogs[:limit], next_cursor
 
-def create(request: schemas.BlogCreate, db: Session):
-        # Automatically assign user_id (e.g., 1)
-    default_user_id = 1
+def stream_all(after: Optional[int] = None, session_factory=None, chunk_size: int = STREAM_CHUNK_SIZE):
+    """Yield every blog as NDJSON, chunk_size rows at a time.
 
-    # Check if user exists
-    user = db.query(models.User).filter(models.User.id == default_user_id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"User with id {default_user_id} not found. Please create a user first."
-        )
+    The generator owns its session because it keeps running after the
+    request's get_db dependency has been cleaned up. `session_factory`
+    picks the database (e.g. a replica); the primary by default.
+    """
+    if sharding.shards is not None:
+        for rows in sharding.shards.stream(after, chunk_size):
+            yield _ndjson(rows)
+        return
+
+    db = (session_factory or database.SessionLocal)()
+    try:
+        stmt = select(models.Blog.id, models.Blog.title, models.Blog.body).order_by(models.Blog.id)
+        if after is not None:
+            stmt = stmt.where(models.Blog.id > after)
+
+        result = db.execute(stmt.execution_options(stream_results=True, yield_per=chunk_size))
+        for rows in result.partitions():
+            yield _ndjson(rows)
+    finally:
+        db.close()
+
+def _ndjson(rows) -> bytes:
+    return "".join(json.dumps(dict(row._mapping)) + "\n" for row in rows).encode()
+
+def search(q: str, db: Session, limit: int = DEFAULT_PAGE_SIZE, after: Optional[tuple] = None):
+    # Full-text search over title and body, best BM25 match first
+    match = fts.match_query(q)
+    if match is None:
+        return [], None
 
+    if sharding.shards is not None:
+        hits = sharding.shards.search(match, limit + 1, after)
+    else:
+        stmt, params = fts.search_statement(match, limit + 1, after)
+        hits = (db.execute(stmt, params)).all()
+    next_cursor = encode_rank_cursor(hits[limit - 1].rank, hits[limit - 1].id) if len(hits) > limit else None
+    return fts.render(hits[:limit]), next_cursor
+
+def create(request: schemas.BlogCreate, db: Session, user_id: int):
+    if group_commit.writer is not None:
+        # Committed together with other concurrent creates by the group-commit writer
+        return group_commit.writer.run(request.title, request.body, user_id)
+    if sharding.shards is not None:
+        new_blog = sharding.shards.insert([{"title": request.title, "body": request.body, "user_id": user_id}])[0]
+        cache.invalidate_users([user_id])
+        return new_blog
+
+    # The author is the authenticated principal, already known to exist
     new_blog = models.Blog(
         title=request.title,
         body=request.body,
-        user_id=default_user_id
+        user_id=user_id
     )
     db.add(new_blog)
     db.commit()
+    cache.invalidate_users([user_id])
     db.refresh(new_blog)
     return new_blog
 
 def delete(id: int, db: Session):
-    blog_query = db.query(models.Blog).filter(models.Blog.id == id)
+    # DELETE ... RETURNING doubles as the existence check and names the author
+    if sharding.shards is not None:
+        deleted = sharding.shards.delete(id)
+    else:
+        deleted = db.execute(
+            sql_delete(models.Blog).where(models.Blog.id == id).returning(models.Blog.user_id)
+        ).first()
+        db.commit()
 
-    if not blog_query.first():
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Blog with id {id} not found"
         )
 
-    blog_query.delete(synchronize_session=False)
-    db.commit()
+    cache.invalidate_blogs([id], [deleted.user_id])
     return {"message": "Blog deleted successfully"}
 
 def update(id: int, request: schemas.BlogUpdate , db: Session):
-    blog_query = db.query(models.Blog).filter(models.Blog.id == id)
+    # UPDATE ... RETURNING: one round-trip that also tells us whether the blog exists
+    if sharding.shards is not None:
+        blog = sharding.shards.update(id, request.model_dump())
+    else:
+        blog = db.execute(
+            sql_update(models.Blog)
+            .where(models.Blog.id == id)
+            .values(**request.model_dump())
+            .returning(models.Blog.id, models.Blog.title, models.Blog.body, models.Blog.user_id)
+        ).first()
+        db.commit()
 
-    if not blog_query.first():
+    if not blog:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Blog with id {id} not found"
         )
 
-    blog_query.update(request.dict())
-    db.commit()
-    return {"message": "Updated successfully"}
+    cache.invalidate_blogs([id], [blog.user_id])
+    return blog
 
 def show(id : int, db: Session):
-    blog = db.query(models.Blog).filter(models.Blog.id == id).first()
+    if sharding.shards is not None:
+        blog = sharding.shards.get(id)
+    else:
+        blog = db.execute(
+            select(models.Blog.id, models.Blog.title, models.Blog.body).where(models.Blog.id == id)
+        ).first()
 
     if not blog:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Blog with id {id} not found"
         )
-    return blog
\ No newline at end of file
+    return blog
+
+# ---------- Bulk writes: one statement per chunk, one commit per batch ----------
+
+# Ids per IN (...) list, well under SQLite's bound-parameter limit
+IN_CHUNK_SIZE = 500
+
+def _chunks(items: list, size: int = IN_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _check_batch_size(items: list):
+    if len(items) > config.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {config.BULK_MAX_ITEMS} items per bulk request"
+        )
+
+def create_many(requests: List[schemas.BlogBase], db: Session, user_id: int):
+    _check_batch_size(requests)
+    rows = [{"title": r.title, "body": r.body, "user_id": user_id} for r in requests]
+
+    if sharding.shards is not None:
+        ids = [row.id for row in sharding.shards.insert(rows)]
+    else:
+        # executemany INSERT ... RETURNING, ids come back in input order
+        ids = db.scalars(
+            insert(models.Blog).returning(models.Blog.id, sort_by_parameter_order=True),
+            rows
+        ).all() if rows else []
+        db.commit()
+    cache.invalidate_users([user_id])
+    return {"results": [
+        {"index": i, "id": id, "status": status.HTTP_201_CREATED} for i, id in enumerate(ids)
+    ]}
+
+def update_many(requests: List[schemas.BlogBulkUpdate], db: Session):
+    _check_batch_size(requests)
+    ids = [r.id for r in requests]
+
+    existing = {}  # id -> user_id
+    if sharding.shards is not None:
+        existing = sharding.shards.update_many([r.model_dump() for r in requests])
+    else:
+        for chunk in _chunks(ids):
+            existing.update(db.execute(
+                select(models.Blog.id, models.Blog.user_id).where(models.Blog.id.in_(chunk))
+            ).tuples().all())
+
+        rows = [r.model_dump() for r in requests if r.id in existing]
+        if rows:
+            # ORM bulk UPDATE by primary key: a single executemany
+            db.execute(sql_update(models.Blog), rows)
+        db.commit()
+    cache.invalidate_blogs(existing.keys(), existing.values())
+    return {"results": [_item_result(i, r.id, r.id in existing, status.HTTP_200_OK)
+                        for i, r in enumerate(requests)]}
+
+def delete_many(ids: List[int], db: Session):
+    _check_batch_size(ids)
+
+    deleted = {}  # id -> user_id
+    if sharding.shards is not None:
+        deleted = sharding.shards.delete_many(ids)
+    else:
+        for chunk in _chunks(ids):
+            deleted.update(db.execute(
+                sql_delete(models.Blog).where(models.Blog.id.in_(chunk)).returning(models.Blog.id, models.Blog.user_id)
+            ).tuples().all())
+        db.commit()
+    cache.invalidate_blogs(deleted.keys(), deleted.values())
+    return {"results": [_item_result(i, id, id in deleted, status.HTTP_200_OK)
+                        for i, id in enumerate(ids)]}
+
+def _item_result(index: int, id: int, found: bool, ok_status: int):
+    if found:
+        return {"index": index, "id": id, "status": ok_status}
+    return {"index": index, "id": id, "status": status.HTTP_404_NOT_FOUND,
+            "detail": f"Blog with id {id} not found"}
\ No newline at end of file
@@ -0,0 +1,182 @@
+import asyncio
+from typing import List, Optional
+from sqlalchemy import select, insert, update as sql_update, delete as sql_delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models, schemas, database, cache, search as fts, group_commit, sharding
+from ..pagination import DEFAULT_PAGE_SIZE, STREAM_CHUNK_SIZE, encode_cursor, encode_rank_cursor
+from . import blog as blog_sync
+from .blog import _chunks, _check_batch_size, _item_result, _ndjson
+from fastapi import HTTPException, status
+from starlette.concurrency import iterate_in_threadpool
+
+# Async counterparts of repository/blog.py, used when config.ASYNC_DB is on.
+# With sharding on they run the sync version (which then leaves `db` unused) in a thread.
+
+async def get_all(db: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, after: Optional[int] = None):
+    if sharding.shards is not None:
+        return await asyncio.to_thread(blog_sync.get_all, None, limit, after)
+
+    stmt = select(models.Blog.id, models.Blog.title, models.Blog.body).order_by(models.Blog.id)
+    if after is not None:
+        stmt = stmt.where(models.Blog.id > after)
+
+    # Fetch one extra row to know whether another page exists
+    blogs = (await db.execute(stmt.limit(limit + 1))).all()
+    next_cursor = encode_cursor(blogs[limit - 1].id) if len(blogs) > limit else None
+    return blogs[:limit], next_cursor
+
+async def stream_all(after: Optional[int] = None, session_factory=None, chunk_size: int = STREAM_CHUNK_SIZE):
+    """Async version of blog.stream_all; owns its own session for the same reason."""
+    if sharding.shards is not None:
+        async for chunk in iterate_in_threadpool(blog_sync.stream_all(after, chunk_size=chunk_size)):
+            yield chunk
+        return
+
+    async with (session_factory or database.AsyncSessionLocal)() as db:
+        stmt = select(models.Blog.id, models.Blog.title, models.Blog.body).order_by(models.Blog.id)
+        if after is not None:
+            stmt = stmt.where(models.Blog.id > after)
+
+        result = await db.stream(stmt.execution_options(yield_per=chunk_size))
+        async for rows in result.partitions():
+            yield _ndjson(rows)
+
+async def search(q: str, db: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, after: Optional[tuple] = None):
+    if sharding.shards is not None:
+        return await asyncio.to_thread(blog_sync.search, q, None, limit, after)
+
+    # Full-text search over title and body, best BM25 match first
+    match = fts.match_query(q)
+    if match is None:
+        return [], None
+
+    stmt, params = fts.search_statement(match, limit + 1, after)
+    hits = (await db.execute(stmt, params)).all()
+    next_cursor = encode_rank_cursor(hits[limit - 1].rank, hits[limit - 1].id) if len(hits) > limit else None
+    return fts.render(hits[:limit]), next_cursor
+
+async def create(request: schemas.BlogCreate, db: AsyncSession, user_id: int):
+    if group_commit.writer is not None:
+        return await group_commit.writer.run_async(request.title, request.body, user_id)
+    if sharding.shards is not None:
+        return await asyncio.to_thread(blog_sync.create, request, None, user_id)
+
+    # The author is the authenticated principal, already known to exist
+    new_blog = models.Blog(
+        title=request.title,
+        body=request.body,
+        user_id=user_id
+    )
+    db.add(new_blog)
+    await db.commit()
+    cache.invalidate_users([user_id])
+    return new_blog
+
+async def delete(id: int, db: AsyncSession):
+    if sharding.shards is not None:
+        return await asyncio.to_thread(blog_sync.delete, id, None)
+
+    deleted = (await db.execute(
+        sql_delete(models.Blog).where(models.Blog.id == id).returning(models.Blog.user_id)
+    )).first()
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Blog with id {id} not found"
+        )
+
+    await db.commit()
+    cache.invalidate_blogs([id], [deleted.user_id])
+    return {"message": "Blog deleted successfully"}
+
+async def update(id: int, request: schemas.BlogUpdate, db: AsyncSession):
+    if sharding.shards is not None:
+        return await asyncio.to_thread(blog_sync.update, id, request, None)
+
+    blog = (await db.execute(
+        sql_update(models.Blog)
+        .where(models.Blog.id == id)
+        .values(**request.model_dump())
+        .returning(models.Blog.id, models.Blog.title, models.Blog.body, models.Blog.user_id)
+    )).first()
+    if not blog:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Blog with id {id} not found"
+        )
+
+    await db.commit()
+    cache.invalidate_blogs([id], [blog.user_id])
+    return blog
+
+async def show(id: int, db: AsyncSession):
+    if sharding.shards is not None:
+        return await asyncio.to_thread(blog_sync.show, id, None)
+
+    blog = (await db.execute(
+        select(models.Blog.id, models.Blog.title, models.Blog.body).where(models.Blog.id == id)
+    )).first()
+
+    if not blog:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Blog with id {id} not found"
+        )
+    return blog
+
+
+# ---------- Bulk writes (see repository/blog.py) ----------
+
+async def create_many(requests: List[schemas.BlogBase], db: AsyncSession, user_id: int):
+    if sharding.shards is not None:
+        return await asyncio.to_thread(blog_sync.create_many, requests, None, user_id)
+
+    _check_batch_size(requests)
+    rows = [{"title": r.title, "body": r.body, "user_id": user_id} for r in requests]
+
+    ids = (await db.scalars(
+        insert(models.Blog).returning(models.Blog.id, sort_by_parameter_order=True),
+        rows
+    )).all() if rows else []
+    await db.commit()
+    cache.invalidate_users([user_id])
+    return {"results": [
+        {"index": i, "id": id, "status": status.HTTP_201_CREATED} for i, id in enumerate(ids)
+    ]}
+
+async def update_many(requests: List[schemas.BlogBulkUpdate], db: AsyncSession):
+    if sharding.shards is not None:
+        return await asyncio.to_thread(blog_sync.update_many, requests, None)
+
+    _check_batch_size(requests)
+    ids = [r.id for r in requests]
+
+    existing = {}  # id -> user_id
+    for chunk in _chunks(ids):
+        existing.update((await db.execute(
+            select(models.Blog.id, models.Blog.user_id).where(models.Blog.id.in_(chunk))
+        )).tuples().all())
+
+    rows = [r.model_dump() for r in requests if r.id in existing]
+    if rows:
+        await db.execute(sql_update(models.Blog), rows)
+    await db.commit()
+    cache.invalidate_blogs(existing.keys(), existing.values())
+    return {"results": [_item_result(i, r.id, r.id in existing, status.HTTP_200_OK)
+                        for i, r in enumerate(requests)]}
+
+async def delete_many(ids: List[int], db: AsyncSession):
+    if sharding.shards is not None:
+        return await asyncio.to_thread(blog_sync.delete_many, ids, None)
+
+    _check_batch_size(ids)
+
+    deleted = {}  # id -> user_id
+    for chunk in _chunks(ids):
+        deleted.update((await db.execute(
+            sql_delete(models.Blog).where(models.Blog.id.in_(chunk)).returning(models.Blog.id, models.Blog.user_id)
+        )).tuples().all())
+    await db.commit()
+    cache.invalidate_blogs(deleted.keys(), deleted.values())
+    return {"results": [_item_result(i, id, id in deleted, status.HTTP_200_OK)
+                        for i, id in enumerate(ids)]}
@@ -1,31 +1,94 @@
+from typing import Optional
+from sqlalchemy import select, and_, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from .. import models, schemas
+from .. import models, schemas, config, cache, sharding
+from ..pagination import encode_cursor
 from fastapi import HTTPException, status
 from .. hashing import Hash #importing Hash class from hashing.py file
 
 
 def create(request: schemas.ShowUser, db:Session):
-    # optional: simple duplicate email check
-    existing = db.query(models.User).filter(models.User.email == request.email).first()
-    if existing:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="A user with this email already exists"
-        )
     new_user = models.User(
         name=request.name,
         email=request.email,
         password= Hash.bcrypt(request.password)
     )
     db.add(new_user)
-    db.commit()
+    # Single INSERT: the unique index on users.email rejects duplicates
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A user with this email already exists"
+        )
+    cache.invalidate_users([new_user.id])
     db.refresh(new_user)
     return new_user
 
-def show(id: int, db: Session):
-    user = db.query(models.User).filter(models.User.id == id).first()
-    if not user:
+def show(id: int, db: Session, blogs_limit: int = config.USER_BLOGS_LIMIT,
+         blogs_after: Optional[int] = None, summary: bool = False):
+    if sharding.shards is not None:
+        return show_sharded(id, db.execute(user_statement(id)).first(), blogs_limit, blogs_after, summary)
+
+    rows = db.execute(show_statement(id, blogs_limit, blogs_after, summary)).all()
+    if not rows:
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"User with this id {id} is not available")
-    
-    return user
\ No newline at end of file
+
+    blog_rows = [row for row in rows if row.blog_id is not None]
+    return show_result(rows[0], blog_rows, blogs_limit, summary, rows[0].blogs_total if summary else None)
+
+def user_statement(id: int):
+    return select(models.User.id, models.User.name, models.User.email).where(models.User.id == id)
+
+def show_sharded(id: int, user, blogs_limit: int, blogs_after: Optional[int], summary: bool):
+    """Sharded mode: `user` comes from the main database, their blogs from their shard."""
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"User with this id {id} is not available")
+    blog_rows, total = sharding.shards.user_blogs(id, blogs_limit + 1, blogs_after, summary)
+    return show_result(user, blog_rows, blogs_limit, summary, total)
+
+def show_statement(id: int, blogs_limit: int, blogs_after: Optional[int], summary: bool):
+    """The user and one page of their blogs in a single LEFT JOIN query.
+
+    Summary mode leaves `body` out of the projection and adds the total count.
+    """
+    blog_columns = [models.Blog.id.label("blog_id"), models.Blog.title]
+    if summary:
+        total = select(func.count()).select_from(models.Blog).where(models.Blog.user_id == id)
+        blog_columns.append(total.scalar_subquery().label("blogs_total"))
+    else:
+        blog_columns.append(models.Blog.body)
+
+    on = models.Blog.user_id == models.User.id
+    if blogs_after is not None:
+        on = and_(on, models.Blog.id > blogs_after)
+
+    return (
+        select(models.User.id, models.User.name, models.User.email, *blog_columns)
+        .outerjoin(models.Blog, on)
+        .where(models.User.id == id)
+        .order_by(models.Blog.id)
+        # One row per blog, plus one to know whether another page exists
+        .limit(blogs_limit + 1)
+    )
+
+def show_result(user, blog_rows: list, blogs_limit: int, summary: bool, blogs_total: Optional[int] = None):
+    blogs_next = encode_cursor(blog_rows[blogs_limit - 1].blog_id) if len(blog_rows) > blogs_limit else None
+    blog_rows = blog_rows[:blogs_limit]
+
+    if summary:
+        return schemas.ShowUserSummary(
+            id=user.id, name=user.name, email=user.email,
+            blogs=[schemas.BlogSummary(id=row.blog_id, title=row.title) for row in blog_rows],
+            blogs_total=blogs_total, blogs_next=blogs_next
+        )
+    return schemas.ShowUser(
+        id=user.id, name=user.name, email=user.email,
+        blogs=[schemas.BlogBase(title=row.title, body=row.body) for row in blog_rows],
+        blogs_next=blogs_next
+    )
\ No newline at end of file
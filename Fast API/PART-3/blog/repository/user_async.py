@@ -0,0 +1,44 @@
+import asyncio
+from typing import Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException, status
+from .. import models, schemas, config, cache, sharding
+from .. hashing import Hash
+from .user import show_statement, show_result, user_statement, show_sharded
+
+# Async counterparts of repository/user.py, used when config.ASYNC_DB is on
+
+async def create(request: schemas.UserCreate, db: AsyncSession):
+    new_user = models.User(
+        name=request.name,
+        email=request.email,
+        password=await Hash.bcrypt_async(request.password),
+        blogs=[]
+    )
+    db.add(new_user)
+    # Single INSERT: the unique index on users.email rejects duplicates
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A user with this email already exists"
+        )
+    cache.invalidate_users([new_user.id])
+    return new_user
+
+async def show(id: int, db: AsyncSession, blogs_limit: int = config.USER_BLOGS_LIMIT,
+               blogs_after: Optional[int] = None, summary: bool = False):
+    if sharding.shards is not None:
+        user = (await db.execute(user_statement(id))).first()
+        return await asyncio.to_thread(show_sharded, id, user, blogs_limit, blogs_after, summary)
+
+    rows = (await db.execute(show_statement(id, blogs_limit, blogs_after, summary))).all()
+    if not rows:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"User with this id {id} is not available")
+
+    blog_rows = [row for row in rows if row.blog_id is not None]
+    return show_result(rows[0], blog_rows, blogs_limit, summary, rows[0].blogs_total if summary else None)
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends, status, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from .. import schemas, database, models, token
+from .. import schemas, database, models, token, admission
 from ..hashing import Hash
 from sqlalchemy.orm import Session
-router = APIRouter(tags=['Authentication'])
+router = APIRouter(tags=['Authentication'], dependencies=[Depends(admission.gates["authentication"])])
 
 @router.post('/login')
 def login(request:OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
@@ -11,9 +11,14 @@ def login(request:OAuth2PasswordRequestForm = Depends(), db: Session = Depends(d
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail=f"Invalid Credentials")
-    if not Hash.verify(request.password, user.password):
+    verified, new_hash = Hash.verify_and_update(request.password, user.password)
+    if not verified:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail=f"Incorrect password")
+    if new_hash:
+        # Stored at another cost than config.BCRYPT_ROUNDS; redo it while we have the password
+        user.password = new_hash
+        db.commit()
 
-    access_token = token.create_access_token(data={"sub": user.email})
+    access_token = token.create_access_token(data={"sub": user.email, "id": user.id})
     return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import database, models, token, admission
+from ..hashing import Hash
+
+# Async twin of routers/authentication.py, mounted instead of it when config.ASYNC_DB is on
+router = APIRouter(tags=['Authentication'], dependencies=[Depends(admission.gates["authentication"])])
+
+@router.post('/login')
+async def login(request:OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(database.get_async_db)):
+    user = await db.scalar(select(models.User).where(models.User.email == request.username))
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"Invalid Credentials")
+    verified, new_hash = await Hash.verify_and_update_async(request.password, user.password)
+    if not verified:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"Incorrect password")
+    if new_hash:
+        # Stored at another cost than config.BCRYPT_ROUNDS; redo it while we have the password
+        user.password = new_hash
+        await db.commit()
+
+    access_token = token.create_access_token(data={"sub": user.email, "id": user.id})
+    return {"access_token": access_token, "token_type": "bearer"}
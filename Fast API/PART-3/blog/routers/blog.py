@@ -1,24 +1,62 @@
-from typing import List
-from fastapi import APIRouter, Depends, status, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, Depends, status, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from .. import schemas, database, models, oauth2
+from .. import schemas, database, cache, models, oauth2, serialization, admission
+from ..pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, decode_rank_cursor, set_next_link
 from ..repository import blog
 
 router = APIRouter(
     prefix="/blog",
-    tags=['Blogs']
+    tags=['Blogs'],
+    dependencies=[Depends(admission.gates["blog"])]
 )
 
 get_db = database.get_db
+# GET routes read from a replica when configured
+get_read_db = database.get_read_db
 
 
 # ---------- Get all blogs ----------
 @router.get('/', response_model=List[schemas.ShowBlog])
 def get_all_blogs(
-    db: Session = Depends(get_db),
-    current_user: schemas.UserBase = Depends(oauth2.get_current_user)
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    stream: bool = False,
+    db: Session = Depends(get_read_db),
+    current_user: schemas.Principal = Depends(oauth2.get_current_user)
+):
+    after_id = decode_cursor(after) if after else None
+
+    # ?stream=true sends every blog after the cursor as NDJSON
+    if stream:
+        session_factory = database.read_session_factory(request)
+        return StreamingResponse(blog.stream_all(after_id, session_factory), media_type="application/x-ndjson")
+
+    # Serialized from Core rows by precompiled adapters, same bytes as response_model would give
+    blogs, next_cursor = blog.get_all(db, limit, after_id)
+    return serialization.blog_list(blogs, request, limit, next_cursor)
+
+
+# ---------- Full-text search (declared before /{id}) ----------
+@router.get('/search', response_model=List[schemas.SearchHit])
+def search_blogs(
+    q: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_user: schemas.Principal = Depends(oauth2.get_current_user)
 ):
-    return blog.get_all(db)
+    if not database.IS_SQLITE:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED,
+                            detail="Search needs the SQLite FTS5 index")
+
+    hits, next_cursor = blog.search(q, db, limit, decode_rank_cursor(after) if after else None)
+    set_next_link(request, response, limit, next_cursor)
+    return hits
 
 
 # ---------- Create a new blog ----------
@@ -26,9 +64,40 @@ def get_all_blogs(
 def create_blog(
     request: schemas.BlogCreate,
     db: Session = Depends(get_db),
-    current_user: schemas.UserBase = Depends(oauth2.get_current_user)
+    current_user: schemas.Principal = Depends(oauth2.get_current_user)
+):
+    if request.user_id is not None and request.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail="user_id must be the authenticated user")
+    return blog.create(request, db, current_user.id)
+
+
+# ---------- Bulk create / update / delete ----------
+@router.post('/bulk', response_model=schemas.BulkResult)
+def create_blogs(
+    request: List[schemas.BlogBase],
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(oauth2.get_current_user)
+):
+    return blog.create_many(request, db, current_user.id)
+
+
+@router.put('/bulk', response_model=schemas.BulkResult)
+def update_blogs(
+    request: List[schemas.BlogBulkUpdate],
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(oauth2.get_current_user)
 ):
-    return blog.create(request, db)
+    return blog.update_many(request, db)
+
+
+@router.post('/bulk/delete', response_model=schemas.BulkResult)
+def delete_blogs(
+    request: schemas.BlogBulkDelete,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(oauth2.get_current_user)
+):
+    return blog.delete_many(request.ids, db)
 
 
 # ---------- Delete a blog ----------
@@ -36,9 +105,9 @@ def create_blog(
 def delete_blog(
     id: int,
     db: Session = Depends(get_db),
-    current_user: schemas.UserBase = Depends(oauth2.get_current_user)
+    current_user: schemas.Principal = Depends(oauth2.get_current_user)
 ):
-    return blog.destroy(id, db)
+    blog.delete(id, db)
 
 
 # ---------- Update a blog ----------
@@ -47,7 +116,7 @@ def update_blog(
     id: int,
     request: schemas.BlogUpdate,
     db: Session = Depends(get_db),
-    current_user: schemas.UserBase = Depends(oauth2.get_current_user)
+    current_user: schemas.Principal = Depends(oauth2.get_current_user)
 ):
     return blog.update(id, request, db)
 
@@ -56,7 +125,15 @@ def update_blog(
 @router.get('/{id}', status_code=status.HTTP_200_OK, response_model=schemas.ShowBlog)
 def get_blog_by_id(
     id: int,
-    db: Session = Depends(get_db),
-    current_user: schemas.UserBase = Depends(oauth2.get_current_user)
+    request: Request,
+    db: Session = Depends(get_read_db),
+    current_user: schemas.Principal = Depends(oauth2.get_current_user)
 ):
-    return blog.show(id, db)
\ No newline at end of file
+    # Served from the response cache (or 304) without touching the database when possible
+    key = cache.blog_key(id)
+    cached = cache.lookup(request, key)
+    if cached is not None:
+        return cached
+    version = cache.version()
+    result = schemas.ShowBlog.model_validate(blog.show(id, db))
+    return cache.store(request, key, key, result, version, fill=not database.is_replica(db))
\ No newline at end of file
@@ -0,0 +1,139 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, status, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import schemas, database, cache, oauth2, serialization, admission
+from ..pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, decode_rank_cursor, set_next_link
+from ..repository import blog_async as blog
+
+# Async twin of routers/blog.py, mounted instead of it when config.ASYNC_DB is on
+router = APIRouter(
+    prefix="/blog",
+    tags=['Blogs'],
+    dependencies=[Depends(admission.gates["blog"])]
+)
+
+get_db = database.get_async_db
+get_read_db = database.get_async_read_db
+
+
+# ---------- Get all blogs ----------
+@router.get('/', response_model=List[schemas.ShowBlog])
+async def get_all_blogs(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: schemas.Principal = Depends(oauth2.get_current_user)
+):
+    after_id = decode_cursor(after) if after else None
+
+    # ?stream=true sends every blog after the cursor as NDJSON
+    if stream:
+        session_factory = database.async_read_session_factory(request)
+        return StreamingResponse(blog.stream_all(after_id, session_factory), media_type="application/x-ndjson")
+
+    # Serialized from Core rows by precompiled adapters, same bytes as response_model would give
+    blogs, next_cursor = await blog.get_all(db, limit, after_id)
+    return serialization.blog_list(blogs, request, limit, next_cursor)
+
+
+# ---------- Full-text search (declared before /{id}) ----------
+@router.get('/search', response_model=List[schemas.SearchHit])
+async def search_blogs(
+    q: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: schemas.Principal = Depends(oauth2.get_current_user)
+):
+    if not database.IS_SQLITE:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED,
+                            detail="Search needs the SQLite FTS5 index")
+
+    hits, next_cursor = await blog.search(q, db, limit, decode_rank_cursor(after) if after else None)
+    set_next_link(request, response, limit, next_cursor)
+    return hits
+
+
+# ---------- Create a new blog ----------
+@router.post('/', status_code=status.HTTP_201_CREATED, response_model=schemas.ShowBlog)
+async def create_blog(
+    request: schemas.BlogCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: schemas.Principal = Depends(oauth2.get_current_user)
+):
+    if request.user_id is not None and request.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail="user_id must be the authenticated user")
+    return await blog.create(request, db, current_user.id)
+
+
+# ---------- Bulk create / update / delete ----------
+@router.post('/bulk', response_model=schemas.BulkResult)
+async def create_blogs(
+    request: List[schemas.BlogBase],
+    db: AsyncSession = Depends(get_db),
+    current_user: schemas.Principal = Depends(oauth2.get_current_user)
+):
+    return await blog.create_many(request, db, current_user.id)
+
+
+@router.put('/bulk', response_model=schemas.BulkResult)
+async def update_blogs(
+    request: List[schemas.BlogBulkUpdate],
+    db: AsyncSession = Depends(get_db),
+    current_user: schemas.Principal = Depends(oauth2.get_current_user)
+):
+    return await blog.update_many(request, db)
+
+
+@router.post('/bulk/delete', response_model=schemas.BulkResult)
+async def delete_blogs(
+    request: schemas.BlogBulkDelete,
+    db: AsyncSession = Depends(get_db),
+    current_user: schemas.Principal = Depends(oauth2.get_current_user)
+):
+    return await blog.delete_many(request.ids, db)
+
+
+# ---------- Delete a blog ----------
+@router.delete('/{id}', status_code=status.HTTP_204_NO_CONTENT)
+async def delete_blog(
+    id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: schemas.Principal = Depends(oauth2.get_current_user)
+):
+    await blog.delete(id, db)
+
+
+# ---------- Update a blog ----------
+@router.put('/{id}', status_code=status.HTTP_202_ACCEPTED, response_model=schemas.ShowBlog)
+async def update_blog(
+    id: int,
+    request: schemas.BlogUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: schemas.Principal = Depends(oauth2.get_current_user)
+):
+    return await blog.update(id, request, db)
+
+
+# ---------- Get a specific blog ----------
+@router.get('/{id}', status_code=status.HTTP_200_OK, response_model=schemas.ShowBlog)
+async def get_blog_by_id(
+    id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: schemas.Principal = Depends(oauth2.get_current_user)
+):
+    # Served from the response cache (or 304) without touching the database when possible
+    key = cache.blog_key(id)
+    cached = cache.lookup(request, key)
+    if cached is not None:
+        return cached
+    version = cache.version()
+    result = schemas.ShowBlog.model_validate(await blog.show(id, db))
+    return cache.store(request, key, key, result, version, fill=not database.is_replica(db))
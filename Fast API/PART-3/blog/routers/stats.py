@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import FileResponse
+from .. import admission, config, hashing, group_commit, profiling, tracing
+
+router = APIRouter(
+    prefix="/stats",
+    tags=['Stats']
+)
+
+
+# ---------- Password hashing pool counters ----------
+@router.get('/hashing')
+def hashing_stats():
+    if hashing.pool is None:
+        return {"pool_size": 0}
+    return hashing.pool.stats()
+
+
+# ---------- Group-commit writer counters ----------
+@router.get('/group-commit')
+def group_commit_stats():
+    if group_commit.writer is None:
+        return {"enabled": False}
+    return {"enabled": True, **group_commit.writer.stats()}
+
+
+# ---------- Admission control counters ----------
+@router.get('/admission')
+def admission_stats():
+    return admission.stats()
+
+
+# ---------- Trace exporter counters ----------
+@router.get('/tracing')
+def tracing_stats():
+    if tracing.exporter is None:
+        return {"enabled": False}
+    return {"enabled": True, "sample_rate": config.TRACE_SAMPLE_RATE, **tracing.exporter.stats()}
+
+
+# ---------- Request profiles (config.PROFILE) ----------
+def require_profile_token(request: Request):
+    # Profiles hold stack samples of production requests: reading one takes the same token as asking for one
+    if not profiling.authorized(request.scope):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="X-Profile token required")
+
+
+@router.get('/profiles', dependencies=[Depends(require_profile_token)])
+def profiles():
+    return profiling.listing()
+
+
+@router.get('/profiles/{id}', dependencies=[Depends(require_profile_token)])
+def profile(id: str):
+    if profiling.find(id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Profile {id} not found")
+    # Collapsed stacks: flamegraph.pl, speedscope or inferno turn them into a flame graph
+    return FileResponse(profiling.path_of(id), media_type="text/plain", filename=f"{id}.folded")
\ No newline at end of file
@@ -1,20 +1,40 @@
-from fastapi import APIRouter, Depends, status
-from .. import schemas, database, models
+from typing import Optional, Union
+from fastapi import APIRouter, Depends, Query, Request, status
+from .. import schemas, database, cache, models, config, admission
+from ..pagination import MAX_PAGE_SIZE, decode_cursor
 from sqlalchemy.orm import Session
 from ..repository import user
 
 router = APIRouter(
       prefix = "/user",
-      tags=['Users']
+      tags=['Users'],
+      dependencies=[Depends(admission.gates["user"])]
 )
 
 get_db = database.get_db
+get_read_db = database.get_read_db
 
 # Create user (POST)
 @router.post('/', response_model=schemas.ShowUser, status_code=status.HTTP_201_CREATED)
 def create_user(request: schemas.UserCreate, db: Session = Depends(get_db)):
         return user.create(request, db)
 
-@router.get('/{id}', response_model=schemas.ShowUser)
-def get_user(id:int, db: Session = Depends(get_db)):
-        return user.show(id, db)
\ No newline at end of file
+# Get user with one page of their blogs (?summary=true: ids + titles only)
+@router.get('/{id}', response_model=Union[schemas.ShowUser, schemas.ShowUserSummary])
+def get_user(
+        id:int,
+        request: Request,
+        blogs_limit: int = Query(config.USER_BLOGS_LIMIT, ge=1, le=MAX_PAGE_SIZE),
+        blogs_after: Optional[str] = None,
+        summary: bool = False,
+        db: Session = Depends(get_read_db)
+):
+        key = cache.user_key(id, request)
+        cached = cache.lookup(request, key)
+        if cached is not None:
+                return cached
+
+        version = cache.version()
+        after_id = decode_cursor(blogs_after) if blogs_after else None
+        result = user.show(id, db, blogs_limit, after_id, summary)
+        return cache.store(request, key, cache.user_tag(id), result, version, fill=not database.is_replica(db))
\ No newline at end of file
@@ -0,0 +1,41 @@
+from typing import Optional, Union
+from fastapi import APIRouter, Depends, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import schemas, database, cache, config, admission
+from ..pagination import MAX_PAGE_SIZE, decode_cursor
+from ..repository import user_async as user
+
+# Async twin of routers/user.py, mounted instead of it when config.ASYNC_DB is on
+router = APIRouter(
+      prefix = "/user",
+      tags=['Users'],
+      dependencies=[Depends(admission.gates["user"])]
+)
+
+get_db = database.get_async_db
+get_read_db = database.get_async_read_db
+
+# Create user (POST)
+@router.post('/', response_model=schemas.ShowUser, status_code=status.HTTP_201_CREATED)
+async def create_user(request: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
+        return await user.create(request, db)
+
+# Get user with one page of their blogs (?summary=true: ids + titles only)
+@router.get('/{id}', response_model=Union[schemas.ShowUser, schemas.ShowUserSummary])
+async def get_user(
+        id:int,
+        request: Request,
+        blogs_limit: int = Query(config.USER_BLOGS_LIMIT, ge=1, le=MAX_PAGE_SIZE),
+        blogs_after: Optional[str] = None,
+        summary: bool = False,
+        db: AsyncSession = Depends(get_read_db)
+):
+        key = cache.user_key(id, request)
+        cached = cache.lookup(request, key)
+        if cached is not None:
+                return cached
+
+        version = cache.version()
+        after_id = decode_cursor(blogs_after) if blogs_after else None
+        result = await user.show(id, db, blogs_limit, after_id, summary)
+        return cache.store(request, key, cache.user_tag(id), result, version, fill=not database.is_replica(db))
@@ -11,7 +11,8 @@ class BlogBase(BaseModel):
 
 # Request schema for creating a blog
 class BlogCreate(BlogBase):
-    user_id: int  # Added user_id for linking blog with user
+    # The author is the token's principal; kept for old clients, and must name that user if sent
+    user_id: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -19,6 +20,33 @@ class BlogCreate(BlogBase):
 class BlogUpdate(BlogBase):
     pass
 
+# One hit of GET /blog/search: HTML-escaped text, matched terms wrapped in <mark></mark>
+class SearchHit(BaseModel):
+    id: int
+    title: str
+    snippet: str
+    rank: float  # BM25, lower is a better match
+    class Config:
+        from_attributes = True
+
+# One item of PUT /blog/bulk
+class BlogBulkUpdate(BlogUpdate):
+    id: int
+
+# Body of POST /blog/bulk/delete
+class BlogBulkDelete(BaseModel):
+    ids: List[int]
+
+# Per-item outcome of a bulk request, in input order
+class BulkItemResult(BaseModel):
+    index: int
+    id: int
+    status: int
+    detail: Optional[str] = None
+
+class BulkResult(BaseModel):
+    results: List[BulkItemResult]
+
 
 # ---------- User Schemas ----------
 
@@ -37,10 +65,25 @@ class ShowUser(BaseModel):
     name: str
     email: str
     blogs: List[BlogBase] = []
+    blogs_next: Optional[str] = None  # cursor for the next page of blogs, if any
     class Config:
         from_attributes = True
 
 
+# GET /user/{id}?summary=true: blog ids and titles only, plus the total count
+class BlogSummary(BaseModel):
+    id: int
+    title: str
+
+class ShowUserSummary(BaseModel):
+    id: int
+    name: str
+    email: str
+    blogs: List[BlogSummary] = []
+    blogs_total: int
+    blogs_next: Optional[str] = None
+
+
 # Response schema for showing blog details (without creator info)
 class ShowBlog(BaseModel):
     id: int
@@ -58,4 +101,9 @@ class Token(BaseModel):
     token_type: str
 
 class TokenData(BaseModel):
-    email: Optional[str] = None
\ No newline at end of file
+    email: Optional[str] = None
+
+# Authenticated user, as carried by the access token
+class Principal(BaseModel):
+    id: int
+    email: str
\ No newline at end of file
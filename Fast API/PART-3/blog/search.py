@@ -0,0 +1,131 @@
+"""SQLite FTS5 index over blogs.title and blogs.body.
+
+The index is an external-content FTS5 table kept in sync by triggers, so
+every write path (ORM, bulk executemany, raw SQL) updates it. Bodies may be
+stored compressed (see compression.py), so the index reads them through the
+blogs_fts_content view and the triggers through blog_body().
+
+Rebuild the index of an existing database file:
+
+    python -m blog.search rebuild [--url sqlite:///./blog.db]
+"""
+import argparse
+import html
+from typing import Optional
+from sqlalchemy import create_engine, text
+from . import compression  # noqa: F401  registers blog_body() on every connection
+
+FTS_DDL = [
+    """CREATE VIEW IF NOT EXISTS blogs_fts_content AS
+        SELECT id, title, blog_body(body) AS body FROM blogs""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS blogs_fts USING fts5(
+        title, body, content='blogs_fts_content', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS blogs_fts_ai AFTER INSERT ON blogs BEGIN
+        INSERT INTO blogs_fts(rowid, title, body) VALUES (new.id, new.title, blog_body(new.body));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS blogs_fts_ad AFTER DELETE ON blogs BEGIN
+        INSERT INTO blogs_fts(blogs_fts, rowid, title, body) VALUES ('delete', old.id, old.title, blog_body(old.body));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS blogs_fts_au AFTER UPDATE OF title, body ON blogs BEGIN
+        INSERT INTO blogs_fts(blogs_fts, rowid, title, body) VALUES ('delete', old.id, old.title, blog_body(old.body));
+        INSERT INTO blogs_fts(rowid, title, body) VALUES (new.id, new.title, blog_body(new.body));
+    END""",
+]
+
+# Everything FTS_DDL creates, for reinstalling the index with a new layout
+FTS_DROP = [
+    "DROP TRIGGER IF EXISTS blogs_fts_ai",
+    "DROP TRIGGER IF EXISTS blogs_fts_ad",
+    "DROP TRIGGER IF EXISTS blogs_fts_au",
+    "DROP TABLE IF EXISTS blogs_fts",
+    "DROP VIEW IF EXISTS blogs_fts_content",
+]
+
+# Wraps matched terms in title highlights and body snippets
+HIGHLIGHT_OPEN, HIGHLIGHT_CLOSE = "<mark>", "</mark>"
+SNIPPET_TOKENS = 16
+
+# FTS5 marks matches with these; render() escapes the text, then swaps them for the tags
+_MATCH_OPEN, _MATCH_CLOSE = "\x02", "\x03"
+
+
+def install(conn):
+    """Create the index and triggers if missing; index existing rows the first time."""
+    existed = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'blogs_fts'")
+    ).first()
+    for ddl in FTS_DDL:
+        conn.execute(text(ddl))
+    if not existed:
+        rebuild(conn)
+
+
+def uninstall(conn):
+    for ddl in FTS_DROP:
+        conn.execute(text(ddl))
+
+
+def rebuild(conn):
+    """Re-read every row of `blogs` into the index."""
+    conn.execute(text("INSERT INTO blogs_fts(blogs_fts) VALUES ('rebuild')"))
+
+
+def match_query(q: str) -> Optional[str]:
+    """Turn free text into an FTS5 query: every word must match, operators are not interpreted."""
+    terms = ['"' + term.replace('"', '""') + '"' for term in q.split()]
+    return " ".join(terms) or None
+
+
+def search_statement(match: str, limit: int, after: Optional[tuple] = None):
+    """BM25-ranked hits (best first), keyset-paginated on (rank, id)."""
+    sql = f"""
+        SELECT * FROM (
+            SELECT blogs.id AS id,
+                   highlight(blogs_fts, 0, :open, :close) AS title,
+                   snippet(blogs_fts, 1, :open, :close, '…', :tokens) AS snippet,
+                   bm25(blogs_fts) AS rank
+            FROM blogs_fts JOIN blogs ON blogs.id = blogs_fts.rowid
+            WHERE blogs_fts MATCH :match
+        )
+        {"WHERE rank > :after_rank OR (rank = :after_rank AND id > :after_id)" if after else ""}
+        ORDER BY rank, id
+        LIMIT :limit
+    """
+    params = {"match": match, "open": _MATCH_OPEN, "close": _MATCH_CLOSE,
+              "tokens": SNIPPET_TOKENS, "limit": limit}
+    if after:
+        params["after_rank"], params["after_id"] = after
+    return text(sql), params
+
+
+def _highlighted(value: str) -> str:
+    # Titles and bodies are user input: escape them so only the <mark> tags are markup
+    return html.escape(value).replace(_MATCH_OPEN, HIGHLIGHT_OPEN).replace(_MATCH_CLOSE, HIGHLIGHT_CLOSE)
+
+
+def render(hits) -> list:
+    """Rows of search_statement() as SearchHit dicts, HTML-escaped with matches in <mark></mark>."""
+    return [
+        {"id": hit.id, "title": _highlighted(hit.title), "snippet": _highlighted(hit.snippet), "rank": hit.rank}
+        for hit in hits
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the blogs full-text index")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--url", help="database URL (defaults to BLOG_DATABASE_URL)")
+    args = parser.parse_args()
+
+    from . import config
+    engine = create_engine(args.url or config.SQLALCHEMY_DATABASE_URL)
+    with engine.begin() as conn:
+        install(conn)
+        rebuild(conn)
+        count = conn.execute(text("SELECT count(*) FROM blogs")).scalar()
+    print(f"Rebuilt blogs_fts: {count} blogs indexed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+from typing import List, Optional
+import orjson
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from . import schemas
+from .pagination import set_next_link
+
+# Built once at import; FastAPI otherwise validates a List[...] response_model
+# item by item on every request.
+SHOW_BLOG_LIST = TypeAdapter(List[schemas.ShowBlog])
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson.
+
+    Produces the same bytes as FastAPI's default JSON output (compact, UTF-8,
+    no ASCII escaping) for str/int/bool/None/list/dict content. Floats may be
+    formatted differently, so only use it for payloads without them.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+def blog_list(rows, request: Request, limit: int, next_cursor: Optional[str]) -> ORJSONResponse:
+    """GET /blog/ body from Core rows (id, title, body), skipping ORM instances.
+
+    The rows are still validated against ShowBlog, so a bad row fails the
+    request just as response_model would.
+    """
+    blogs = SHOW_BLOG_LIST.validate_python(rows, from_attributes=True)
+    response = ORJSONResponse(SHOW_BLOG_LIST.dump_python(blogs, mode="json"))
+    # A returned Response does not pick up headers set on the injected one
+    set_next_link(request, response, limit, next_cursor)
+    return response
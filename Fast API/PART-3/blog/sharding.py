@@ -0,0 +1,301 @@
+"""Blogs spread over several SQLite files by a hash of user_id (config.SHARD_URLS).
+
+Users stay in BLOG_DATABASE_URL. Each shard file holds the blogs of the
+users whose slot maps to it, and runs the regular migrations, so it has its
+own FTS index. A blog id carries its author's slot:
+
+    id = seq * SLOTS + slot(user_id)        shard = slot % number of shards
+
+so reads and writes of one blog go straight to its shard, and resharding
+moves whole slots between files without changing any id.
+
+Copy the blogs onto a new set of shard files (with writers stopped):
+
+    python -m blog.sharding reshard --to sqlite:///./shard0.db,sqlite:///./shard1.db
+
+The source is the current BLOG_SHARD_URLS or, before sharding, the blogs of
+BLOG_DATABASE_URL, whose ids are then re-keyed to old_id * SLOTS + slot.
+"""
+import argparse
+import heapq
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Optional
+from sqlalchemy import (Integer, String, bindparam, create_engine, select, insert, update as sql_update,
+                        delete as sql_delete, func, text)
+from . import config, database, migrations, models, search as fts, sqlite_profile
+from .compression import CompressedText
+
+# Fixed slot count: the upper bound on the number of shards
+SLOTS = 1024
+
+# Ids per IN (...) list, well under SQLite's bound-parameter limit
+IN_CHUNK_SIZE = 500
+
+# The next id of the author's slot is computed inside the INSERT, which holds
+# the shard's write lock, so concurrent writers never pick the same one.
+# Typed like models.Blog.body, so long bodies are stored compressed.
+INSERT_BLOG = text("""
+    INSERT INTO blogs (id, title, body, user_id)
+    VALUES ((coalesce((SELECT max(id) FROM blogs), 0) / :slots + 1) * :slots + :slot, :title, :body, :user_id)
+    RETURNING id, title, body
+""").bindparams(bindparam("body", type_=CompressedText())).columns(id=Integer, title=String, body=CompressedText())
+
+
+def slot_of_user(user_id: int) -> int:
+    return zlib.crc32(str(user_id).encode()) % SLOTS
+
+
+def slot_of_blog(id: int) -> int:
+    return id % SLOTS
+
+
+def _chunks(items: list, size: int = IN_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _engine(url: str):
+    engine = create_engine(url, connect_args={"check_same_thread": False}, **database.POOL_ARGS)
+    if database.SQLITE_PRAGMAS:
+        sqlite_profile.install(engine, database.SQLITE_PRAGMAS)
+    return engine
+
+
+class ShardSet:
+    """One engine per shard file, plus a thread pool to query them in parallel."""
+
+    def __init__(self, urls: list):
+        if len(urls) > SLOTS:
+            raise ValueError(f"At most {SLOTS} shards are supported")
+        self.urls = urls
+        self.engines = [_engine(url) for url in urls]
+        self._pool = ThreadPoolExecutor(max_workers=len(urls), thread_name_prefix="blog-shard")
+
+    def shard_of_slot(self, slot: int) -> int:
+        return slot % len(self.engines)
+
+    def for_blog(self, id: int):
+        return self.engines[self.shard_of_slot(slot_of_blog(id))]
+
+    def for_user(self, user_id: int):
+        return self.engines[self.shard_of_slot(slot_of_user(user_id))]
+
+    def fan_out(self, fn, items=None) -> list:
+        """fn(item) for every item (default: every engine) in parallel, results in order."""
+        return list(self._pool.map(fn, self.engines if items is None else items))
+
+    def check(self, auto_migrate: bool):
+        for engine in self.engines:
+            migrations.check(engine, auto_migrate)
+
+    # ---------- Writes ----------
+
+    def insert(self, rows: list) -> list:
+        """Insert {title, body, user_id} rows, one transaction per shard; (id, title, body) in input order."""
+        by_shard = {}
+        for index, row in enumerate(rows):
+            slot = slot_of_user(row["user_id"])
+            by_shard.setdefault(self.shard_of_slot(slot), []).append((index, {**row, "slot": slot, "slots": SLOTS}))
+
+        def write(item):
+            shard, batch = item
+            with self.engines[shard].begin() as conn:
+                return [(index, conn.execute(INSERT_BLOG, params).one()) for index, params in batch]
+
+        results = [None] * len(rows)
+        for written in self.fan_out(write, list(by_shard.items())):
+            for index, row in written:
+                results[index] = row
+        return results
+
+    def update(self, id: int, values: dict):
+        with self.for_blog(id).begin() as conn:
+            return conn.execute(
+                sql_update(models.Blog).where(models.Blog.id == id).values(**values)
+                .returning(models.Blog.id, models.Blog.title, models.Blog.body, models.Blog.user_id)
+            ).first()
+
+    def delete(self, id: int):
+        with self.for_blog(id).begin() as conn:
+            return conn.execute(
+                sql_delete(models.Blog).where(models.Blog.id == id).returning(models.Blog.user_id)
+            ).first()
+
+    def _by_shard(self, items: list, id_of) -> list:
+        groups = {}
+        for item in items:
+            groups.setdefault(self.shard_of_slot(slot_of_blog(id_of(item))), []).append(item)
+        return list(groups.items())
+
+    def update_many(self, rows: list) -> dict:
+        """Bulk UPDATE of {id, title, body} rows; returns id -> user_id of those that existed."""
+        def write(item):
+            shard, shard_rows = item
+            existing = {}
+            with self.engines[shard].begin() as conn:
+                for chunk in _chunks([row["id"] for row in shard_rows]):
+                    existing.update(conn.execute(
+                        select(models.Blog.id, models.Blog.user_id).where(models.Blog.id.in_(chunk))
+                    ).tuples().all())
+                found = [row for row in shard_rows if row["id"] in existing]
+                if found:
+                    conn.execute(
+                        sql_update(models.Blog).where(models.Blog.id == bindparam("b_id"))
+                        .values(title=bindparam("b_title"), body=bindparam("b_body")),
+                        [{"b_id": row["id"], "b_title": row["title"], "b_body": row["body"]} for row in found],
+                    )
+            return existing
+
+        existing = {}
+        for found in self.fan_out(write, self._by_shard(rows, lambda row: row["id"])):
+            existing.update(found)
+        return existing
+
+    def delete_many(self, ids: list) -> dict:
+        """Bulk DELETE; returns id -> user_id of the blogs that existed."""
+        def write(item):
+            shard, shard_ids = item
+            deleted = {}
+            with self.engines[shard].begin() as conn:
+                for chunk in _chunks(shard_ids):
+                    deleted.update(conn.execute(
+                        sql_delete(models.Blog).where(models.Blog.id.in_(chunk))
+                        .returning(models.Blog.id, models.Blog.user_id)
+                    ).tuples().all())
+            return deleted
+
+        deleted = {}
+        for found in self.fan_out(write, self._by_shard(ids, lambda id: id)):
+            deleted.update(found)
+        return deleted
+
+    # ---------- Reads ----------
+
+    def get(self, id: int):
+        with self.for_blog(id).connect() as conn:
+            return conn.execute(
+                select(models.Blog.id, models.Blog.title, models.Blog.body).where(models.Blog.id == id)
+            ).first()
+
+    def page(self, limit: int, after: Optional[int] = None) -> list:
+        """The first `limit` blogs after `after` across all shards: each shard's page, merged on id."""
+        stmt = select(models.Blog.id, models.Blog.title, models.Blog.body).order_by(models.Blog.id).limit(limit)
+        if after is not None:
+            stmt = stmt.where(models.Blog.id > after)
+
+        def read(engine):
+            with engine.connect() as conn:
+                return conn.execute(stmt).all()
+
+        return list(islice(heapq.merge(*self.fan_out(read), key=lambda row: row.id), limit))
+
+    def stream(self, after: Optional[int], chunk_size: int):
+        """Every blog after `after` in id order, as lists of up to chunk_size rows."""
+        stmt = select(models.Blog.id, models.Blog.title, models.Blog.body).order_by(models.Blog.id)
+        if after is not None:
+            stmt = stmt.where(models.Blog.id > after)
+
+        def rows(engine):
+            with engine.connect() as conn:
+                yield from conn.execution_options(stream_results=True, yield_per=chunk_size).execute(stmt)
+
+        merged = heapq.merge(*(rows(engine) for engine in self.engines), key=lambda row: row.id)
+        while chunk := list(islice(merged, chunk_size)):
+            yield chunk
+
+    def search(self, match: str, limit: int, after: Optional[tuple] = None) -> list:
+        """Each shard's best `limit` hits, merged on (rank, id).
+
+        BM25 statistics are per shard, so ranks are comparable only approximately.
+        """
+        stmt, params = fts.search_statement(match, limit, after)
+
+        def read(engine):
+            with engine.connect() as conn:
+                return conn.execute(stmt, params).all()
+
+        return list(islice(heapq.merge(*self.fan_out(read), key=lambda hit: (hit.rank, hit.id)), limit))
+
+    def user_blogs(self, user_id: int, limit: int, after: Optional[int], summary: bool):
+        """One page of a user's blogs (all on one shard), and their total in summary mode."""
+        columns = [models.Blog.id.label("blog_id"), models.Blog.title]
+        if not summary:
+            columns.append(models.Blog.body)
+        stmt = select(*columns).where(models.Blog.user_id == user_id).order_by(models.Blog.id).limit(limit)
+        if after is not None:
+            stmt = stmt.where(models.Blog.id > after)
+
+        with self.for_user(user_id).connect() as conn:
+            rows = conn.execute(stmt).all()
+            total = None
+            if summary:
+                total = conn.execute(
+                    select(func.count()).select_from(models.Blog).where(models.Blog.user_id == user_id)
+                ).scalar()
+        return rows, total
+
+
+# None unless config.SHARD_URLS is set; then the repositories route blog queries here
+shards = ShardSet(config.SHARD_URLS) if config.SHARD_URLS else None
+
+
+def reshard(sources: list, targets: list, rekey: bool, batch: int = 5000) -> list:
+    """Copy every blog of `sources` into new, empty shard files `targets`."""
+    target_engines = [create_engine(url) for url in targets]
+    for url, engine in zip(targets, target_engines):
+        migrations.upgrade(engine)
+        with engine.connect() as conn:
+            if conn.execute(select(func.count()).select_from(models.Blog)).scalar():
+                raise SystemExit(f"{url} already holds blogs; reshard into new files")
+
+    counts = [0] * len(targets)
+    for url in sources:
+        source = create_engine(url)
+        with source.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=batch).execute(
+                select(models.Blog.id, models.Blog.title, models.Blog.body, models.Blog.user_id)
+            )
+            for rows in result.partitions():
+                by_target = {}
+                for row in rows:
+                    id = row.id * SLOTS + slot_of_user(row.user_id) if rekey else row.id
+                    by_target.setdefault(slot_of_blog(id) % len(targets), []).append(
+                        {"id": id, "title": row.title, "body": row.body, "user_id": row.user_id}
+                    )
+                for index, values in by_target.items():
+                    with target_engines[index].begin() as target:
+                        target.execute(insert(models.Blog), values)
+                    counts[index] += len(values)
+        source.dispose()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the blog shard files")
+    parser.add_argument("command", choices=["reshard"])
+    parser.add_argument("--to", required=True, help="comma-separated URLs of the new (empty) shard files")
+    parser.add_argument("--from", dest="sources",
+                        help="comma-separated shard URLs to read (default: BLOG_SHARD_URLS, else BLOG_DATABASE_URL)")
+    args = parser.parse_args()
+
+    targets = [url.strip() for url in args.to.split(",") if url.strip()]
+    if args.sources:
+        sources, rekey = [url.strip() for url in args.sources.split(",") if url.strip()], False
+    elif config.SHARD_URLS:
+        sources, rekey = config.SHARD_URLS, False
+    else:
+        # Unsharded ids do not carry a slot yet
+        sources, rekey = [config.SQLALCHEMY_DATABASE_URL], True
+
+    counts = reshard(sources, targets, rekey)
+    for url, count in zip(targets, counts):
+        print(f"{url}: {count} blogs")
+    if rekey:
+        print(f"Blog ids were re-keyed: new_id = old_id * {SLOTS} + slot")
+    print(f"Now set BLOG_SHARD_URLS={','.join(targets)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import logging
+from sqlalchemy import event
+
+logger = logging.getLogger("blog.db")
+
+# Applied, in this order, to every new SQLite connection.
+# journal_mode goes first: it cannot change inside a transaction.
+PRODUCTION_PRAGMAS = {
+    "journal_mode": "WAL",       # readers no longer block on the writer (and vice versa)
+    "synchronous": "NORMAL",     # fsync at checkpoints only; safe with WAL
+    "busy_timeout": 5000,        # ms to wait on a lock instead of failing with "database is locked"
+    "cache_size": -64000,        # negative = KiB, so ~64 MB of page cache per connection
+    "mmap_size": 268435456,      # 256 MB of the file read through mmap
+    "temp_store": "MEMORY",      # temp tables and sort spills stay in RAM
+}
+
+
+# PRAGMAs that read back as numbers
+_NAMED_VALUES = {
+    "synchronous": {0: "OFF", 1: "NORMAL", 2: "FULL", 3: "EXTRA"},
+    "temp_store": {0: "DEFAULT", 1: "FILE", 2: "MEMORY"},
+}
+
+
+def apply_pragmas(dbapi_connection, pragmas: dict):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def install(engine, pragmas: dict):
+    """Run `pragmas` on every connection the (sync) engine opens from now on."""
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, pragmas)
+
+
+def effective_settings(engine, names) -> dict:
+    """Read back what SQLite actually uses (e.g. journal_mode stays "memory" for :memory:)."""
+    with engine.connect() as conn:
+        settings = {name: conn.exec_driver_sql(f"PRAGMA {name}").scalar() for name in names}
+    return {name: _NAMED_VALUES.get(name, {}).get(value, value) for name, value in settings.items()}
+
+
+def report(engine, pragmas: dict):
+    settings = effective_settings(engine, pragmas)
+    pool = engine.pool
+    logger.info(
+        "SQLite profile on %s: %s; pool=%s size=%s overflow=%s",
+        engine.url.database, settings, type(pool).__name__,
+        getattr(pool, "size", lambda: None)(), getattr(pool, "_max_overflow", None),
+    )
+    for name, wanted in pragmas.items():
+        if str(settings[name]).lower() != str(wanted).lower():
+            logger.warning("PRAGMA %s requested %s but SQLite reports %s", name, wanted, settings[name])
+    return settings
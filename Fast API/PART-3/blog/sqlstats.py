@@ -0,0 +1,139 @@
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from . import config
+
+logger = logging.getLogger("blog.sql")
+
+
+class StatementBudgetExceeded(AssertionError):
+    """Raised in budget mode when a request/block runs too many statements."""
+
+
+class QueryStats:
+    """Statements seen during one request (or one statement_budget block)."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_sql = None
+        self.by_statement = Counter()
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.total_time += elapsed
+        self.by_statement[statement] += 1
+        if elapsed > self.slowest_time:
+            self.slowest_time, self.slowest_sql = elapsed, statement
+
+    def repeated(self, threshold: int):
+        """Identical statements run `threshold`+ times: the N+1 signature."""
+        return [(sql, n) for sql, n in self.by_statement.items() if n >= threshold]
+
+    def header(self) -> str:
+        return (f"statements={self.count}, time_ms={self.total_time * 1000:.3f}, "
+                f"slowest_ms={self.slowest_time * 1000:.3f}")
+
+
+# Stats of the request being served; sync routes see it through the threadpool's context copy
+_current: ContextVar = ContextVar("blog_sql_stats", default=None)
+# Open statement_budget() blocks, which count across every thread
+_watchers = []
+_watchers_lock = threading.Lock()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("blog_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["blog_query_start"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    if _watchers:
+        with _watchers_lock:
+            for watcher in _watchers:
+                watcher.record(statement, elapsed)
+
+
+def instrument(engine):
+    """Attach the timing hooks to a (sync) Engine; idempotent."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def instrument_app_engines():
+    """Instrument database.engine, the replica and shard engines and, in async mode, the async engines behind them."""
+    from . import database, sharding
+    shard_engines = sharding.shards.engines if sharding.shards is not None else []
+    for engine in [database.engine, *database.replica_engines, *shard_engines]:
+        instrument(engine)
+    for engine in filter(None, [database.async_engine, *database.async_replica_engines]):
+        instrument(engine.sync_engine)
+
+
+def report(stats: QueryStats, label: str):
+    """Log the per-request line and any N+1 suspects; enforce the budget if set."""
+    logger.info("%s %s", label, stats.header())
+    for sql, n in stats.repeated(config.SQL_N_PLUS_ONE_THRESHOLD):
+        logger.warning("possible N+1 in %s: statement ran %d times: %s", label, n, sql)
+    if config.SQL_STATEMENT_BUDGET and stats.count > config.SQL_STATEMENT_BUDGET:
+        raise StatementBudgetExceeded(
+            f"{label} ran {stats.count} statements (budget {config.SQL_STATEMENT_BUDGET})"
+        )
+
+
+@contextmanager
+def statement_budget(max_statements: int):
+    """Fail the enclosed block (e.g. a TestClient call) if it runs too many statements.
+
+        with sqlstats.statement_budget(2):
+            client.get("/user/1")
+    """
+    instrument_app_engines()
+    stats = QueryStats()
+    with _watchers_lock:
+        _watchers.append(stats)
+    try:
+        yield stats
+    finally:
+        with _watchers_lock:
+            _watchers.remove(stats)
+    if stats.count > max_statements:
+        raise StatementBudgetExceeded(
+            f"ran {stats.count} statements (budget {max_statements}): {dict(stats.by_statement)}"
+        )
+
+
+class SQLStatsMiddleware:
+    """ASGI middleware: per-request statement stats in X-DB-Stats and the blog.sql log."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = QueryStats()
+        token = _current.set(stats)
+        label = f'{scope["method"]} {scope["path"]}'
+
+        async def send_with_stats(message):
+            # The route (and its response serialization) is done once headers go out
+            if message["type"] == "http.response.start":
+                report(stats, label)
+                message["headers"] = [*message.get("headers", []), (b"x-db-stats", stats.header().encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current.reset(token)
@@ -1,24 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
-from . import schemas
+from . import schemas, config
 
 SECRET_KEY = "this_is_very_secret"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+
+class VerifiedTokenCache:
+    """Bounded LRU of already verified tokens, each dropped at its `exp`."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # token -> (exp, principal)
+        self._lock = threading.Lock()
+
+    def get(self, token: str):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            exp, principal = entry
+            if exp <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return principal
+
+    def put(self, token: str, exp: float, principal: schemas.Principal):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[token] = (exp, principal)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+verified_tokens = VerifiedTokenCache(config.TOKEN_CACHE_SIZE)
+
+
 def create_access_token(data: dict):
+    # `data` carries the principal: "sub" (email) and "id" (user id)
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token:str,credentials_exception):
+def verify_token(token:str,credentials_exception) -> schemas.Principal:
+    # Hot clients resend the same token: skip the decode + HMAC check
+    principal = verified_tokens.get(token)
+    if principal is not None:
+        return principal
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
+        user_id: int = payload.get("id")
+        if email is None or user_id is None:
             raise credentials_exception
-        token_data = schemas.TokenData(email=email)
+        principal = schemas.Principal(id=user_id, email=email)
     except JWTError:
-        raise credentials_exception
\ No newline at end of file
+        raise credentials_exception
+
+    verified_tokens.put(token, payload["exp"], principal)
+    return principal
\ No newline at end of file
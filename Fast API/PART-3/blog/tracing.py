@@ -0,0 +1,385 @@
+"""Request tracing: spans from the router down to each SQL statement (config.TRACING).
+
+A sampled request gets a trace with a span for
+
+- the request itself (named after its route template, e.g. `GET /blog/{id}`)
+- resolving its dependencies (oauth2.get_current_user has its own span)
+- the endpoint, and every repository and serialization function it calls
+- every SQL statement and session commit
+- validating and serializing the response (response_model)
+
+Head sampling: a request is traced with probability config.TRACE_SAMPLE_RATE,
+joining the caller's trace when it sends a W3C `traceparent` header. Only with
+config.TRACE_TRUST_PARENT does the header's sampled flag decide instead, since
+any client could otherwise have every request traced.
+Everything else only pays for a ContextVar lookup at each instrumented call.
+Sampled responses carry `traceparent`, so callers can find their trace.
+
+Finished traces go through a bounded queue to a writer thread that appends
+them to config.TRACE_FILE, one OTLP/JSON `ExportTraceServiceRequest` per line
+(the format of the OpenTelemetry Collector's file exporter, which its
+`otlpjsonfile` receiver reads back). Traces are dropped, and counted, when the
+queue is full.
+"""
+import functools
+import inspect
+import json
+import logging
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from . import config
+
+logger = logging.getLogger("blog.tracing")
+
+# OTLP SpanKind
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+STATUS_ERROR = 2
+
+SERVICE_NAME = "blog"
+
+
+class Trace:
+    """Spans of one sampled request; appended to from the loop and the threadpool."""
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans = []
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start", "end", "attributes", "error")
+
+    def __init__(self, trace: Trace, parent_id, name: str, kind: int = KIND_INTERNAL, attributes: dict = None):
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.error = None
+        self.start = time.time_ns()
+        self.end = None
+
+    def child(self, name: str, kind: int = KIND_INTERNAL, attributes: dict = None) -> "Span":
+        return Span(self.trace, self.span_id, name, kind, attributes)
+
+    def finish(self, error: BaseException = None):
+        self.end = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.trace.spans.append(self)
+
+    def otlp(self) -> dict:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.error:
+            span["status"] = {"code": STATUS_ERROR, "message": self.error}
+        return span
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+# Innermost open span of the sampled request being served (None: not sampled).
+# Sync routes see it through the threadpool's context copy.
+_current: ContextVar = ContextVar("blog_trace_span", default=None)
+
+
+def current_trace_id():
+    span = _current.get()
+    return span.trace.trace_id if span is not None else None
+
+
+@contextmanager
+def span(name: str, kind: int = KIND_INTERNAL, **attributes):
+    """Child span of the current one; a no-op outside a sampled request."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    child = parent.child(name, kind, attributes)
+    # set() rather than a reset token: the block may resume in another copy of the context
+    _current.set(child)
+    try:
+        yield child
+    except BaseException as exc:
+        child.finish(exc)
+        raise
+    else:
+        child.finish()
+    finally:
+        _current.set(parent)
+
+
+def traced(func, name: str = None):
+    """Wrap a sync or async function in a span named after it."""
+    name = name or f"{func.__module__.rpartition('.')[2]}.{func.__qualname__}"
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return await func(*args, **kwargs)
+            with span(name):
+                return await func(*args, **kwargs)
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+    return wrapper
+
+
+def instrument_module(module):
+    """Trace the public functions defined in `module` (generators are left alone:
+    they run piecemeal, and their statements still show up in the request's trace)."""
+    for attr, func in list(vars(module).items()):
+        if (attr.startswith("_") or not inspect.isfunction(func) or func.__module__ != module.__name__
+                or inspect.isgeneratorfunction(func) or inspect.isasyncgenfunction(func)):
+            continue
+        setattr(module, attr, traced(func))
+
+
+# ---------- SQL statements and commits ----------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    parent = _current.get()
+    if parent is not None:
+        # SELECT/INSERT/..., like OpenTelemetry's SQLAlchemy spans
+        name = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+        sql_span = parent.child(name, KIND_CLIENT, {
+            "db.system": conn.dialect.name,
+            "db.statement": statement,
+        })
+        conn.info.setdefault("blog_trace_spans", []).append(sql_span)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get("blog_trace_spans")
+    if spans:
+        spans.pop().finish()
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    spans = conn.info.get("blog_trace_spans") if conn is not None else None
+    if spans:
+        spans.pop().finish(exception_context.original_exception)
+
+
+def instrument_engine(engine):
+    """Attach the statement hooks to a (sync) Engine; idempotent."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+def _before_commit(session):
+    parent = _current.get()
+    if parent is not None:
+        session.info["blog_trace_commit"] = parent.child("session.commit")
+
+
+def _after_commit(session):
+    commit_span = session.info.pop("blog_trace_commit", None)
+    if commit_span is not None:
+        commit_span.finish()
+
+
+def _after_rollback(session):
+    # A commit that failed
+    commit_span = session.info.pop("blog_trace_commit", None)
+    if commit_span is not None:
+        commit_span.error = "rolled back"
+        commit_span.finish()
+
+
+# ---------- FastAPI request handling ----------
+
+def _instrument_fastapi():
+    """Spans around the steps of FastAPI's request handler.
+
+    They are module globals of fastapi.routing, looked up on every request, so
+    wrapping them there covers every route.
+    """
+    import fastapi.routing
+
+    for attr, name in (("solve_dependencies", "fastapi.dependencies"),
+                       ("run_endpoint_function", "fastapi.endpoint"),
+                       ("serialize_response", "fastapi.serialize_response")):
+        func = getattr(fastapi.routing, attr, None)
+        if func is not None and not hasattr(func, "__wrapped__"):
+            setattr(fastapi.routing, attr, traced(func, name))
+
+
+def instrument_app():
+    """Instrument FastAPI, the repositories, serialization and every app engine; idempotent.
+
+    oauth2.get_current_user opens its own span: routes captured the function
+    itself in Depends() at import, so it cannot be wrapped here.
+    """
+    from . import database, serialization, sharding
+    from .repository import blog, blog_async, user, user_async
+
+    _instrument_fastapi()
+    for module in (blog, blog_async, user, user_async, serialization):
+        if not getattr(module, "_blog_traced", False):
+            instrument_module(module)
+            module._blog_traced = True
+
+    shard_engines = sharding.shards.engines if sharding.shards is not None else []
+    for engine in [database.engine, *database.replica_engines, *shard_engines]:
+        instrument_engine(engine)
+    for engine in filter(None, [database.async_engine, *database.async_replica_engines]):
+        instrument_engine(engine.sync_engine)
+    if not event.contains(Session, "before_commit", _before_commit):
+        event.listen(Session, "before_commit", _before_commit)
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_rollback", _after_rollback)
+
+
+# ---------- Export ----------
+
+class FileExporter:
+    """Appends finished traces to `path` as OTLP/JSON lines from a background thread."""
+
+    def __init__(self, path: str, max_queue: int):
+        self.path = path
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.exported = 0
+        self.dropped = 0
+
+    def export(self, trace: Trace):
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="blog-trace-exporter", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while not self._queue.empty() and len(batch) < 512:
+                batch.append(self._queue.get_nowait())
+            try:
+                with open(self.path, "a") as out:
+                    for trace in batch:
+                        out.write(json.dumps(_otlp_request(trace), separators=(",", ":")) + "\n")
+                self.exported += len(batch)
+            except OSError:
+                self.dropped += len(batch)
+                logger.exception("could not write traces to %s", self.path)
+
+    def stats(self) -> dict:
+        return {"file": self.path, "queued": self._queue.qsize(), "exported": self.exported, "dropped": self.dropped}
+
+
+def _otlp_request(trace: Trace) -> dict:
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{"scope": {"name": "blog.tracing"}, "spans": [span.otlp() for span in trace.spans]}],
+    }]}
+
+
+exporter = FileExporter(config.TRACE_FILE, config.TRACE_QUEUE_SIZE) if config.TRACING else None
+
+
+# ---------- Middleware ----------
+
+# version-traceid-parentid-flags; later versions may append fields, version ff is invalid
+_TRACEPARENT = re.compile(r"(?!ff)[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})(?:-.*)?")
+
+def _parse_traceparent(scope):
+    """(trace id, parent span id, sampled) from a W3C traceparent header, or None.
+
+    Headers with ids that are not lowercase hex (or are all zeros) are ignored.
+    """
+    for name, value in scope["headers"]:
+        if name == b"traceparent":
+            match = _TRACEPARENT.fullmatch(value.decode("latin-1").strip())
+            if match is None:
+                return None
+            trace_id, parent_id, flags = match.groups()
+            if trace_id == "0" * 32 or parent_id == "0" * 16:
+                return None
+            return trace_id, parent_id, bool(int(flags, 16) & 1)
+    return None
+
+
+class TracingMiddleware:
+    """ASGI middleware: decides sampling, opens the request span and exports the trace."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        parent = _parse_traceparent(scope)
+        trace_id, parent_id, sampled = parent or (None, None, False)
+        if parent is None or not config.TRACE_TRUST_PARENT:
+            sampled = random.random() < config.TRACE_SAMPLE_RATE
+        if not sampled:
+            return await self.app(scope, receive, send)
+
+        trace = Trace(trace_id or f"{random.getrandbits(128):032x}")
+        root = Span(trace, parent_id, scope["method"], KIND_SERVER, {
+            "http.request.method": scope["method"],
+            "url.path": scope["path"],
+        })
+        traceparent = f"00-{trace.trace_id}-{root.span_id}-01".encode()
+
+        async def send_with_traceparent(message):
+            if message["type"] == "http.response.start":
+                root.attributes["http.response.status_code"] = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"traceparent", traceparent)]
+            await send(message)
+
+        _current.set(root)
+        error = None
+        try:
+            await self.app(scope, receive, send_with_traceparent)
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            _current.set(None)
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                root.name = f'{scope["method"]} {route}'
+                root.attributes["http.route"] = route
+            root.finish(error)
+            exporter.export(trace)
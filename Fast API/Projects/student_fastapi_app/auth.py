@@ -5,7 +5,7 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from datetime import timedelta
 from models import User, Token
-from utils import verify_password, hash_password, create_access_token, SECRET_KEY, ALGORITHM
+from utils import verify_and_update_password, hash_password, create_access_token, SECRET_KEY, ALGORITHM
 
 # OAuth2 setup
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -23,8 +23,12 @@ def authenticate_user(username: str, password: str):
     user = fake_users_db.get(username)
     if not user:
         return False
-    if not verify_password(password, user["hashed_password"]):
+    verified, new_hash = verify_and_update_password(password, user["hashed_password"])
+    if not verified:
         return False
+    if new_hash:
+        # Stored at another bcrypt cost than BCRYPT_ROUNDS
+        user["hashed_password"] = new_hash
     return user
 
 # Login route to generate JWT
@@ -0,0 +1,98 @@
+# Indexed StudentStore lookups vs scanning a plain dict of students
+#
+#   python benchmark.py [students] [queries]
+#
+# The scan is what GET /students/by-name/ did before the store had indexes:
+# lowercase and compare every name, and the same full pass to filter by age
+# or year. Both sides answer the same queries over the same random students.
+
+import random
+import sys
+import time
+from store import StudentStore
+
+NAMES = [f"Student{n}" for n in range(100000)]
+YEARS = ["1st year", "2nd year", "3rd year", "4th year"]
+
+
+def make_students(count: int, rng: random.Random) -> dict:
+    return {
+        id: {"name": rng.choice(NAMES), "age": rng.randint(17, 30), "year": rng.choice(YEARS)}
+        for id in range(1, count + 1)
+    }
+
+
+def scan_by_name(students: dict, name: str):
+    for student in students.values():
+        if student["name"].lower() == name.lower():
+            return student
+    return None
+
+
+def scan(students: dict, limit: int, name=None, min_age=None, max_age=None, year=None) -> list:
+    found = []
+    for id in sorted(students):
+        student = students[id]
+        if ((name is None or student["name"].lower() == name.lower())
+                and (min_age is None or student["age"] >= min_age)
+                and (max_age is None or student["age"] <= max_age)
+                and (year is None or student["year"] == year)):
+            found.append(id)
+            if len(found) == limit:
+                break
+    return found
+
+
+def timed(run, queries: list) -> float:
+    """Mean milliseconds per query."""
+    started = time.perf_counter()
+    for query in queries:
+        run(query)
+    return (time.perf_counter() - started) / len(queries) * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    rng = random.Random(42)
+
+    students = make_students(count, rng)
+    started = time.perf_counter()
+    store = StudentStore(students)
+    print(f"{count} students, indexed in {time.perf_counter() - started:.1f} s")
+
+    # A missing name is the scan's worst case, a present one its average
+    names = [rng.choice(NAMES).upper() for _ in range(queries)] + ["Nobody"] * queries
+    filters = {
+        "name": [{"name": rng.choice(NAMES)} for _ in range(queries)],
+        "age range 20-21": [{"min_age": 20, "max_age": 21}] * queries,
+        "year + age 29-30": [{"year": "4th year", "min_age": 29}] * queries,
+        "name + year": [{"name": rng.choice(NAMES), "year": "1st year"} for _ in range(queries)],
+        "rare age (none)": [{"min_age": 40}] * queries,
+    }
+
+    print(f"{'query':<22}{'scan ms':>10}{'index ms':>10}{'speedup':>10}")
+    rows = [("by-name", timed(lambda name: scan_by_name(students, name), names),
+             timed(store.find_by_name, names))]
+    for label, cases in filters.items():
+        for case in cases:  # same answers, first page of 50
+            assert scan(students, 50, **case) == [id for id, _ in store.query(**case, limit=50)[0]]
+        rows.append((label, timed(lambda case: scan(students, 50, **case), cases),
+                     timed(lambda case: store.query(**case, limit=50), cases)))
+    for label, scan_ms, index_ms in rows:
+        print(f"{label:<22}{scan_ms:>10.3f}{index_ms:>10.3f}{scan_ms / index_ms:>9.0f}x")
+
+    ids = list(range(count + 1, count + 1 + queries * 50))
+    started = time.perf_counter()
+    for id in ids:
+        store.create(id, {"name": rng.choice(NAMES), "age": 20, "year": "1st year"})
+    for id in ids:
+        store.update(id, {"age": 21})
+    for id in ids:
+        store.delete(id)
+    print(f"create + update + delete with index upkeep: "
+          f"{(time.perf_counter() - started) / len(ids) * 1e6:.1f} us per student")
+
+
+if __name__ == "__main__":
+    main()
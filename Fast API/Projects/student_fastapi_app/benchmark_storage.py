@@ -0,0 +1,114 @@
+# Write throughput and startup time of the durable student store
+#
+#   python benchmark_storage.py [students] [tail_ops]
+#
+# Writes: concurrent writers creating students, with and without fsync, and
+# how many writes shared each flush of the log (group commit).
+# Startup: a store of `students` students is reopened from its log alone
+# (full replay), then from a snapshot plus `tail_ops` logged operations.
+# For comparison, the old workaround paid one JSON dump of every student on
+# each write.
+
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import storage
+from storage import DurableStudentStore
+
+NAMES = [f"Student{n}" for n in range(100000)]
+YEARS = ["1st year", "2nd year", "3rd year", "4th year"]
+
+
+def random_student(rng: random.Random) -> dict:
+    return {"name": rng.choice(NAMES), "age": rng.randint(17, 30), "year": rng.choice(YEARS)}
+
+
+def write_throughput(directory: str, writers: int, seconds: float, fsync: bool) -> tuple:
+    """(writes per second, writes per log flush) for `writers` threads creating students."""
+    store = DurableStudentStore(directory, fsync=fsync, snapshot_min_ops=10 ** 12)
+    stop = time.perf_counter() + seconds
+    counts = [0] * writers
+
+    def write(number: int):
+        rng = random.Random(number)
+        id = number * 10 ** 9
+        while time.perf_counter() < stop:
+            id += 1
+            store.create(id, random_student(rng))
+            counts[number] += 1
+
+    threads = [threading.Thread(target=write, args=(number,)) for number in range(writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    store.close()
+    return sum(counts) / elapsed, sum(counts) / max(store._log.fsyncs, 1)
+
+
+def open_store(directory: str) -> dict:
+    started = time.perf_counter()
+    store = DurableStudentStore(directory)
+    stats = dict(store.startup, total_seconds=time.perf_counter() - started, students=len(store))
+    store.close()
+    return stats
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    tail = int(sys.argv[2]) if len(sys.argv) > 2 else count // 100
+    rng = random.Random(42)
+
+    print(f"{'writers':<10}{'fsync':<8}{'writes/s':>12}{'writes/flush':>14}")
+    for writers in (1, 8, 32):
+        for fsync in (True, False):
+            with tempfile.TemporaryDirectory() as directory:
+                rate, per_flush = write_throughput(directory, writers, 3, fsync)
+            print(f"{writers:<10}{'on' if fsync else 'off':<8}{rate:>12.0f}{per_flush:>14.1f}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        # The log as the API would have written it, one create per student
+        students = {id: random_student(rng) for id in range(1, count + 1)}
+        with open(os.path.join(directory, f"log-{0:020d}.wal"), "wb") as log:
+            for id, student in students.items():
+                log.write(storage._encode("c", id, student))
+        started = time.perf_counter()
+        with open(os.devnull, "w") as out:
+            json.dump(students, out)
+        dump = time.perf_counter() - started
+        del students
+        gc.collect()
+
+        replay = open_store(directory)
+        print(f"\n{count} students, log only: startup {replay['total_seconds']:.1f} s "
+              f"(replayed {replay['replayed_ops']} operations)")
+
+        store = DurableStudentStore(directory, fsync=False, snapshot_min_ops=10 ** 12)
+        started = time.perf_counter()
+        store.snapshot()
+        snapshot = time.perf_counter() - started
+        for _ in range(tail):
+            id = rng.randint(1, count)
+            if id in store:
+                store.update(id, {"age": rng.randint(17, 30)})
+        store.close()
+        del store
+        gc.collect()
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+        reopened = open_store(directory)
+        print(f"snapshot + {reopened['replayed_ops']} logged operations: startup {reopened['total_seconds']:.1f} s "
+              f"(snapshot {reopened['snapshot_seconds']:.1f} s, replay {reopened['replay_seconds']:.2f} s)")
+        print(f"writing the snapshot took {snapshot:.1f} s, {size / 1e6:.0f} MB on disk")
+        print(f"old workaround: one JSON dump of every student, {dump:.1f} s per write")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,21 @@
-from fastapi import FastAPI, Depends, HTTPException, Path
+from fastapi import FastAPI, Depends, HTTPException, Path, Query
 from auth import login_for_access_token, get_current_user
 from fastapi.security import OAuth2PasswordRequestForm
 from models import Student, UpdateStudent
 from typing import Optional
+from storage import DurableStudentStore
+from store import StudentExists, StudentNotFound
+import metrics
 
 app = FastAPI(title="Student CRUD API with JWT Auth")
 
-# In-memory student DB
-students = {
+# Prometheus metrics at GET /metrics
+metrics.install(app)
+
+# Student DB, indexed by name, age and year, kept on disk in STUDENT_DATA_DIR (default ./data)
+students = DurableStudentStore(seed={
     1: {"name": "John", "age": 18, "year": "1st year"}
-}
+})
 
 @app.post("/token")
 def login(form_data: OAuth2PasswordRequestForm = Depends()):
@@ -20,6 +26,21 @@ def index():
     return {"message": "Welcome to the Student API with JWT Authentication"}
 
 
+# Read students matching every given filter, by ascending ID
+@app.get("/students")
+def list_students(
+    name: Optional[str] = None,
+    min_age: Optional[int] = None,
+    max_age: Optional[int] = None,
+    year: Optional[str] = None,
+    after: Optional[int] = Query(None, description="Last student ID of the previous page"),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: dict = Depends(get_current_user)
+):
+    page, next_after = students.query(name, min_age, max_age, year, after, limit)
+    return {"students": [{"id": id, **student} for id, student in page], "next_after": next_after}
+
+
 # Read student by ID
 @app.get("/students/{id}")
 def get_student(
@@ -38,10 +59,10 @@ def get_student_by_name(
     name: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
-    for student in students.values():
-        if student["name"].lower() == name.lower():
-            return student
-    raise HTTPException(status_code=404, detail="Student not found")
+    student = students.find_by_name(name) if name else None
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found")
+    return student
 
 
 # Create student
@@ -51,10 +72,11 @@ def create_student(
     student: Student,
     current_user: dict = Depends(get_current_user)
 ):
-    if id in students:
+    try:
+        created = students.create(id, student.model_dump())
+    except StudentExists:
         raise HTTPException(status_code=400, detail="Student already exists")
-    students[id] = student.model_dump()
-    return {"message": "Student created successfully", "student": students[id]}
+    return {"message": "Student created successfully", "student": created}
 
 
 # Update student
@@ -64,12 +86,14 @@ def update_student(
     student: UpdateStudent,
     current_user: dict = Depends(get_current_user)
 ):
-    if id not in students:
+    changes = {}
+    if student.name: changes["name"] = student.name
+    if student.age: changes["age"] = student.age
+    if student.year: changes["year"] = student.year
+    try:
+        existing = students.update(id, changes)
+    except StudentNotFound:
         raise HTTPException(status_code=404, detail="Student not found")
-    existing = students[id]
-    if student.name: existing["name"] = student.name
-    if student.age: existing["age"] = student.age
-    if student.year: existing["year"] = student.year
     return {"message": "Student updated successfully", "student": existing}
 
 
@@ -79,7 +103,8 @@ def delete_student(
     id: int,
     current_user: dict = Depends(get_current_user)
 ):
-    if id not in students:
+    try:
+        students.delete(id)
+    except StudentNotFound:
         raise HTTPException(status_code=404, detail="Student not found")
-    del students[id]
     return {"message": "Student deleted successfully"}
\ No newline at end of file
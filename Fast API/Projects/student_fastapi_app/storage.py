@@ -0,0 +1,436 @@
+# Durable student storage: an append-only operation log plus periodic snapshots
+#
+# Every create/update/delete is appended to the current log segment
+# (log-<seq>.wal, holding the operations after sequence number <seq>) and
+# fsynced before it is applied in memory and the route returns. A single
+# flusher thread writes everything that queued up while the previous fsync
+# ran, so concurrent writers share one fsync (group commit).
+#
+# Once the log has grown by SNAPSHOT_GROWTH times the students in the last
+# snapshot (and by at least SNAPSHOT_MIN_OPS operations), a background thread
+# starts a new segment, writes the state as of that point to
+# snapshot-<seq>.snap and deletes the older snapshots and segments.
+#
+# Startup memory-maps the latest snapshot, loads its columns, and replays only
+# the segments written since. A torn record at the end of the last segment
+# (a crash mid-write: the record runs past the end of the file, or is the
+# last one in it) is cut off; a bad record with more data after it stops
+# startup with an error naming the segment and offset.
+
+import array
+import gc
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from store import StudentExists, StudentNotFound, StudentStore
+
+DATA_DIR = os.getenv("STUDENT_DATA_DIR", "data")
+# STUDENT_FSYNC=0 trades durability on power loss for write speed (tests, benchmarks)
+FSYNC = os.getenv("STUDENT_FSYNC", "1") != "0"
+SNAPSHOT_GROWTH = float(os.getenv("STUDENT_SNAPSHOT_GROWTH", "1.0"))
+SNAPSHOT_MIN_OPS = int(os.getenv("STUDENT_SNAPSHOT_MIN_OPS", "10000"))
+
+_RECORD = struct.Struct("<II")  # payload length, CRC32 of payload
+_SNAPSHOT_MAGIC = b"STUSNAP1"
+_SNAPSHOT_HEADER = struct.Struct("<8sQQ")  # magic, seq, student count
+_SECTION = struct.Struct("<cQ")  # column kind (q: int64 array, j: JSON), length
+_sync = getattr(os, "fdatasync", os.fsync)
+
+
+def _segment_path(directory: str, start: int) -> str:
+    return os.path.join(directory, f"log-{start:020d}.wal")
+
+
+def _snapshot_path(directory: str, seq: int) -> str:
+    return os.path.join(directory, f"snapshot-{seq:020d}.snap")
+
+
+def _files(directory: str, prefix: str, suffix: str) -> list:
+    """(seq, path) of the data files of one kind, oldest first."""
+    found = []
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and name.endswith(suffix):
+            found.append((int(name[len(prefix):-len(suffix)]), os.path.join(directory, name)))
+    return sorted(found)
+
+
+def _sync_directory(directory: str):
+    # Makes new and renamed files survive a crash (not possible on Windows)
+    if os.name != "nt":
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+# ---------- Operation log ----------
+
+def _encode(op: str, id: int, fields: dict = None) -> bytes:
+    payload = json.dumps([op, id, fields], separators=(",", ":")).encode()
+    return _RECORD.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _read_segment(path: str):
+    """Operations in a segment, the byte offset where the valid records end, and the file size.
+
+    Stops at the first bad record. Raises RuntimeError unless that record is a
+    torn tail: its length runs past the end of the file, or it is the last record.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    ops, offset = [], 0
+    while offset < len(data):
+        if offset + _RECORD.size > len(data):
+            break  # header cut short
+        length, crc = _RECORD.unpack_from(data, offset)
+        end = offset + _RECORD.size + length
+        if end > len(data):
+            break  # payload cut short
+        payload = data[offset + _RECORD.size:end]
+        try:
+            if zlib.crc32(payload) != crc:
+                raise ValueError("checksum mismatch")
+            op = json.loads(payload)
+        except ValueError as exc:
+            if end == len(data):
+                break  # the last record, half-written
+            raise RuntimeError(f"{os.path.basename(path)} is damaged at byte {offset}: {exc}") from exc
+        ops.append(op)
+        offset = end
+    return ops, offset, len(data)
+
+
+class OpLog:
+    """The segment being appended to, with group commit.
+
+    append() queues a record and returns its sequence number; wait(seq) blocks
+    until that record is on disk.
+    """
+
+    def __init__(self, directory: str, start: int, seq: int, fsync: bool = True):
+        self.directory = directory
+        self.fsync = fsync
+        self.seq = seq  # last appended
+        self.durable = seq  # last written (and fsynced)
+        self.fsyncs = 0
+        self._pending = []
+        self._file = self._open(start)
+        self._cond = threading.Condition()
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="student-oplog", daemon=True)
+        self._thread.start()
+
+    def _open(self, start: int):
+        path = _segment_path(self.directory, start)
+        created = not os.path.exists(path)
+        file = open(path, "ab")
+        if created:
+            _sync_directory(self.directory)
+        return file
+
+    def append(self, record: bytes) -> int:
+        with self._cond:
+            if self._error is not None:
+                raise self._error
+            self.seq += 1
+            self._pending.append(record)
+            self._cond.notify_all()
+            return self.seq
+
+    def wait(self, seq: int):
+        with self._cond:
+            while self.durable < seq:
+                if self._error is not None:
+                    raise self._error
+                self._cond.wait()
+
+    def rotate(self) -> int:
+        """Start a new segment after the last appended record; returns its sequence number."""
+        with self._cond:
+            self.wait(self.seq)
+            self._file.close()
+            self._file = self._open(self.seq)
+            return self.seq
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._file.close()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, []
+                last, file = self.seq, self._file
+            try:
+                file.write(b"".join(batch))
+                file.flush()
+                if self.fsync:
+                    _sync(file.fileno())
+            except OSError as exc:
+                with self._cond:
+                    self._error = exc
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self.durable = last
+                self.fsyncs += 1
+                self._cond.notify_all()
+
+
+# ---------- Snapshots ----------
+
+def _int_column(values: list) -> tuple:
+    try:
+        return b"q", array.array("q", values).tobytes()
+    except OverflowError:  # Python ints beyond 64 bits
+        return b"j", json.dumps(values).encode()
+
+
+def _write_snapshot(directory: str, seq: int, ids: list, students: dict):
+    records = [students[id] for id in ids]
+    years = {}
+    year_codes = [years.setdefault(student["year"], len(years)) for student in records]
+    sections = [
+        _int_column(ids),
+        _int_column([student["age"] for student in records]),
+        (b"j", json.dumps([student["name"] for student in records]).encode()),
+        (b"j", json.dumps(list(years)).encode()),
+        _int_column(year_codes),
+    ]
+    path = _snapshot_path(directory, seq)
+    crc = 0
+    with open(path + ".tmp", "wb") as out:
+        def write(data: bytes):
+            nonlocal crc
+            out.write(data)
+            crc = zlib.crc32(data, crc)
+
+        write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, seq, len(ids)))
+        for kind, data in sections:
+            write(_SECTION.pack(kind, len(data)))
+            write(data)
+        out.write(struct.pack("<I", crc))
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(path + ".tmp", path)
+    _sync_directory(directory)
+
+
+def _read_snapshot(path: str) -> tuple:
+    """(seq, ids, names, ages, years) from a snapshot file, read through mmap."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        with memoryview(mapped) as view:
+            (crc,) = struct.unpack_from("<I", view, len(view) - 4)
+            magic, seq, count = _SNAPSHOT_HEADER.unpack_from(view)
+            if magic != _SNAPSHOT_MAGIC or zlib.crc32(view[:-4]) != crc:
+                raise RuntimeError(f"{path} is damaged")
+            columns, offset = [], _SNAPSHOT_HEADER.size
+            for _ in range(5):
+                kind, length = _SECTION.unpack_from(view, offset)
+                offset += _SECTION.size
+                section = view[offset:offset + length]
+                if kind == b"q":
+                    with section.cast("q") as numbers:
+                        columns.append(numbers.tolist())
+                else:
+                    columns.append(json.loads(bytes(section)))
+                section.release()
+                offset += length
+    ids, ages, names, years, year_codes = columns
+    return seq, ids, names, ages, [years[code] for code in year_codes]
+
+
+# ---------- Store ----------
+
+class DurableStudentStore(StudentStore):
+    """A StudentStore kept in `directory`: it comes back, as it was, after a restart.
+
+    Writes return once they are in the log on disk, and are applied in memory
+    only then, in log order: a write whose append or fsync fails is never seen
+    by readers. Writes still waiting for the disk are checked against through
+    _pending (id -> (writes queued, the student after the last one or None)).
+    """
+
+    def __init__(self, directory: str = DATA_DIR, seed: dict = None, fsync: bool = FSYNC,
+                 snapshot_growth: float = SNAPSHOT_GROWTH, snapshot_min_ops: int = SNAPSHOT_MIN_OPS):
+        super().__init__()
+        self.directory = directory
+        self.snapshot_growth = snapshot_growth
+        self.snapshot_min_ops = snapshot_min_ops
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_thread = None
+        self._queued = deque()  # (seq, op, id, fields) appended to the log, not yet applied
+        self._pending = {}
+        os.makedirs(directory, exist_ok=True)
+        for _, leftover in _files(directory, "snapshot-", ".snap.tmp"):
+            os.remove(leftover)
+
+        # Loading creates millions of dicts and sets, which would set off full
+        # garbage collections that find nothing (students hold no reference cycles)
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            fresh, segment, seq = self._recover()
+        finally:
+            if collecting:
+                gc.enable()
+        self._log = OpLog(directory, segment, seq, fsync)
+        if seed and fresh:
+            for id, student in seed.items():
+                self.create(id, student)
+
+    def _recover(self) -> tuple:
+        """Load the latest snapshot and replay the log after it.
+
+        Returns (whether the directory held no data, segment to append to, last sequence number).
+        """
+        started = time.perf_counter()
+        snapshots = _files(self.directory, "snapshot-", ".snap")
+        self._snapshot_seq, self._snapshot_records = 0, 0
+        if snapshots:
+            seq, ids, names, ages, years = _read_snapshot(snapshots[-1][1])
+            self._load(ids, names, ages, years)
+            self._snapshot_seq, self._snapshot_records = seq, len(ids)
+        loaded = time.perf_counter()
+
+        seq, replayed = self._snapshot_seq, 0
+        segments = [(start, path) for start, path in _files(self.directory, "log-", ".wal") if start >= seq]
+        for number, (start, path) in enumerate(segments):
+            if start != seq:
+                raise RuntimeError(f"{path} does not follow operation {seq}; the log is missing a segment")
+            ops, end, size = _read_segment(path)
+            if end < size:
+                if number < len(segments) - 1:
+                    raise RuntimeError(f"{os.path.basename(path)} is damaged at byte {end}")
+                with open(path, "r+b") as torn:  # cut a record left half-written by a crash
+                    torn.truncate(end)
+            for op, id, fields in ops:
+                self._apply(op, id, fields)
+            seq += len(ops)
+            replayed += len(ops)
+        self.startup = {
+            "snapshot_seq": self._snapshot_seq,
+            "snapshot_students": self._snapshot_records,
+            "snapshot_seconds": loaded - started,
+            "replayed_ops": replayed,
+            "replay_seconds": time.perf_counter() - loaded,
+        }
+        return not snapshots and not segments, segments[-1][0] if segments else seq, seq
+
+    def _apply(self, op: str, id: int, fields: dict):
+        if op == "c":
+            StudentStore.create(self, id, fields)
+        elif op == "u":
+            StudentStore.update(self, id, fields)
+        else:
+            StudentStore.delete(self, id)
+
+    # ---------- Writes ----------
+
+    def create(self, id: int, student: dict) -> dict:
+        created = dict(student)
+        with self._lock:
+            if self._latest(id) is not None:
+                raise StudentExists(id)
+            seq = self._append("c", id, created, created)
+        self._commit(seq)
+        return created
+
+    def update(self, id: int, changes: dict) -> dict:
+        with self._lock:
+            old = self._latest(id)
+            if old is None:
+                raise StudentNotFound(id)
+            updated = {**old, **changes}
+            seq = self._append("u", id, changes, updated)
+        self._commit(seq)
+        return updated
+
+    def delete(self, id: int):
+        with self._lock:
+            if self._latest(id) is None:
+                raise StudentNotFound(id)
+            seq = self._append("d", id, None, None)
+        self._commit(seq)
+
+    def _latest(self, id: int):
+        """The student as of the last write appended to the log (None: there is none)."""
+        if id in self._pending:
+            return self._pending[id][1]
+        return self._students.get(id)
+
+    def _append(self, op: str, id: int, fields, after) -> int:
+        seq = self._log.append(_encode(op, id, fields))
+        self._queued.append((seq, op, id, fields))
+        self._pending[id] = (self._pending.get(id, (0, None))[0] + 1, after)
+        return seq
+
+    def _apply_durable(self):
+        """Apply, in log order, the queued writes that are on disk."""
+        durable = self._log.durable
+        while self._queued and self._queued[0][0] <= durable:
+            _, op, id, fields = self._queued.popleft()
+            self._apply(op, id, fields)
+            count, after = self._pending[id]
+            if count == 1:
+                del self._pending[id]
+            else:
+                self._pending[id] = (count - 1, after)
+
+    def _commit(self, seq: int):
+        try:
+            self._log.wait(seq)
+        except Exception:
+            with self._lock:
+                self._apply_durable()
+                # The log has failed: whatever did not reach the disk never will
+                self._queued.clear()
+                self._pending.clear()
+            raise
+        with self._lock:
+            self._apply_durable()
+        due = max(self.snapshot_min_ops, self.snapshot_growth * self._snapshot_records)
+        if seq - self._snapshot_seq >= due:
+            with self._lock:
+                if self._snapshot_thread is None or not self._snapshot_thread.is_alive():
+                    self._snapshot_thread = threading.Thread(target=self.snapshot, name="student-snapshot",
+                                                             daemon=True)
+                    self._snapshot_thread.start()
+
+    # ---------- Snapshots ----------
+
+    def snapshot(self) -> int:
+        """Write a snapshot of the current state and delete the log and snapshots it replaces."""
+        with self._snapshot_lock:
+            with self._lock:
+                seq = self._log.rotate()
+                self._apply_durable()
+                ids, students = self._ids.copy(), self._students.copy()
+            _write_snapshot(self.directory, seq, ids, students)
+            self._snapshot_seq, self._snapshot_records = seq, len(ids)
+            for old, path in _files(self.directory, "snapshot-", ".snap"):
+                if old < seq:
+                    os.remove(path)
+            for start, path in _files(self.directory, "log-", ".wal"):
+                if start < seq:
+                    os.remove(path)
+            return seq
+
+    def close(self):
+        """Wait for a running snapshot and stop the log's flusher thread."""
+        with self._snapshot_lock:
+            self._log.close()
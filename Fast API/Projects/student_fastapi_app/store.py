@@ -0,0 +1,172 @@
+# In-memory student store with secondary indexes
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+from itertools import chain, islice
+
+
+class StudentExists(Exception):
+    """create() was given an id that is already taken."""
+
+
+class StudentNotFound(Exception):
+    """update() or delete() was given an id with no student."""
+
+
+class StudentStore:
+    """Students by id, plus indexes kept up to date by create/update/delete:
+
+    - name: case-folded name -> ids (hash index)
+    - age: ids per age, with the distinct ages kept sorted for range queries
+    - year: year -> ids (hash index)
+    - ids: every id in ascending order, for paging through results
+
+    Writes and queries take a lock, since sync routes run on a threadpool.
+    A stored student dict is never changed in place (update replaces it), so
+    a shallow copy of the store is a consistent snapshot.
+    """
+
+    def __init__(self, students: dict = None):
+        self._students = {}
+        self._by_name = {}
+        self._by_age = {}
+        self._ages = []
+        self._by_year = {}
+        self._ids = []
+        self._lock = threading.RLock()
+        for id, student in (students or {}).items():
+            self.create(id, student)
+
+    def __len__(self):
+        return len(self._students)
+
+    def __contains__(self, id: int):
+        return id in self._students
+
+    def get(self, id: int):
+        return self._students.get(id)
+
+    # ---------- Writes ----------
+
+    def create(self, id: int, student: dict) -> dict:
+        student = dict(student)
+        with self._lock:
+            if id in self._students:
+                raise StudentExists(id)
+            self._students[id] = student
+            insort(self._ids, id)
+            self._index(id, student)
+        return student
+
+    def update(self, id: int, changes: dict) -> dict:
+        with self._lock:
+            old = self._students.get(id)
+            if old is None:
+                raise StudentNotFound(id)
+            self._unindex(id, old)
+            student = self._students[id] = {**old, **changes}
+            self._index(id, student)
+        return student
+
+    def delete(self, id: int):
+        with self._lock:
+            if id not in self._students:
+                raise StudentNotFound(id)
+            student = self._students.pop(id)
+            del self._ids[bisect_left(self._ids, id)]
+            self._unindex(id, student)
+
+    def _load(self, ids: list, names: list, ages: list, years: list):
+        """Fill an empty store from columns, `ids` ascending (bulk version of create)."""
+        students, by_name, by_age, by_year = self._students, self._by_name, self._by_age, self._by_year
+        for id, name, age, year in zip(ids, names, ages, years):
+            students[id] = {"name": name, "age": age, "year": year}
+            key = name.casefold()
+            same = by_name.get(key)
+            if same is None:
+                by_name[key] = {id}
+            else:
+                same.add(id)
+        for index, column in ((by_age, ages), (by_year, years)):
+            for id, key in zip(ids, column):
+                same = index.get(key)
+                if same is None:
+                    index[key] = {id}
+                else:
+                    same.add(id)
+        self._ids = list(ids)
+        self._ages = sorted(by_age)
+
+    def _index(self, id: int, student: dict):
+        self._by_name.setdefault(student["name"].casefold(), set()).add(id)
+        age = student["age"]
+        if age not in self._by_age:
+            self._by_age[age] = set()
+            insort(self._ages, age)
+        self._by_age[age].add(id)
+        self._by_year.setdefault(student["year"], set()).add(id)
+
+    def _unindex(self, id: int, student: dict):
+        _discard(self._by_name, student["name"].casefold(), id)
+        if _discard(self._by_age, student["age"], id):
+            del self._ages[bisect_left(self._ages, student["age"])]
+        _discard(self._by_year, student["year"], id)
+
+    # ---------- Reads ----------
+
+    def find_by_name(self, name: str):
+        """Some student with this name, ignoring case, or None."""
+        with self._lock:
+            ids = self._by_name.get(name.casefold())
+            return self._students[min(ids)] if ids else None
+
+    def query(self, name: str = None, min_age: int = None, max_age: int = None, year: str = None,
+              after: int = None, limit: int = 50) -> tuple:
+        """Students matching every given filter, by ascending id, after id `after`.
+
+        Returns (list of (id, student), id to pass as `after` for the next page or None).
+        """
+        with self._lock:
+            # Candidate ids from each filter's index, with their sizes (age: a range of buckets)
+            folded = name.casefold() if name is not None else None
+            candidates = []
+            if name is not None:
+                ids = self._by_name.get(folded, ())
+                candidates.append((len(ids), ids))
+            if min_age is not None or max_age is not None:
+                low = bisect_left(self._ages, min_age) if min_age is not None else 0
+                high = bisect_right(self._ages, max_age) if max_age is not None else len(self._ages)
+                buckets = [self._by_age[age] for age in self._ages[low:high]]
+                candidates.append((sum(map(len, buckets)), chain.from_iterable(buckets)))
+            if year is not None:
+                ids = self._by_year.get(year, ())
+                candidates.append((len(ids), ids))
+
+            def matches(id: int) -> bool:
+                student = self._students[id]
+                return ((folded is None or student["name"].casefold() == folded)
+                        and (min_age is None or student["age"] >= min_age)
+                        and (max_age is None or student["age"] <= max_age)
+                        and (year is None or student["year"] == year))
+
+            start = bisect_right(self._ids, after) if after is not None else 0
+            size, ids = min(candidates, key=lambda candidate: candidate[0], default=(len(self), None))
+            # Walking ids in order finds `limit` matches after about limit * len / size ids;
+            # sorting the smallest candidate set costs about `size`. Take the cheaper.
+            if ids is None or size and (limit + 1) * len(self) // size < size:
+                in_order = map(self._ids.__getitem__, range(start, len(self._ids)))
+                page = list(islice(filter(matches, in_order), limit + 1))
+            else:
+                page = sorted(id for id in ids if (after is None or id > after) and matches(id))[:limit + 1]
+            next_after = page[limit - 1] if len(page) > limit else None
+            return [(id, self._students[id]) for id in page[:limit]], next_after
+
+
+def _discard(index: dict, key, id: int) -> bool:
+    """Drop `id` from index[key]; True if that emptied (and removed) the key."""
+    ids = index[key]
+    ids.discard(id)
+    if not ids:
+        del index[key]
+        return True
+    return False
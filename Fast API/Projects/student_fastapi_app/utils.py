@@ -1,16 +1,30 @@
 # Handles Password Hashing and JWT creation
 
+import argparse
+import os
+import statistics
+import time
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from passlib.hash import bcrypt
 
 # Secret key and algorithm
 SECRET_KEY = "your_secret_key_here"  # Change this to a secure random key
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing setup
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost; pick it for this machine with `python utils.py calibrate --target-ms 250`
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Password hashing setup (hashes at any other cost are redone on the next login)
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 
 # Hash a password
 def hash_password(password: str):
@@ -21,9 +35,48 @@ def hash_password(password: str):
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+# Verify password, plus a new hash when the stored one is not at BCRYPT_ROUNDS (else None)
+def verify_and_update_password(plain_password: str, hashed_password: str):
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+# Highest bcrypt cost (at least 10) that verifies within target_ms here,
+# and the median verify time in ms of every cost tried
+def calibrate_rounds(target_ms: float = 250, samples: int = 3) -> tuple:
+    best, timings = 10, {}
+    for rounds in range(4, 32):
+        hashed = bcrypt.using(rounds=rounds).hash("calibration password")
+        taken = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            bcrypt.verify("calibration password", hashed)
+            taken.append((time.perf_counter() - started) * 1000)
+        timings[rounds] = statistics.median(taken)
+        if timings[rounds] > target_ms:
+            break
+        best = max(best, rounds)
+    return best, timings
+
 # Create JWT access token
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
\ No newline at end of file
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+def main():
+    parser = argparse.ArgumentParser(description="bcrypt cost calibration")
+    parser.add_argument("command", choices=["calibrate"])
+    parser.add_argument("--target-ms", type=float, default=250, help="verify time to aim for")
+    parser.add_argument("--samples", type=int, default=3, help="timings per cost (median is used)")
+    args = parser.parse_args()
+
+    rounds, timings = calibrate_rounds(args.target_ms, args.samples)
+    for cost, ms in timings.items():
+        marker = "  <- current" if cost == BCRYPT_ROUNDS else ""
+        print(f"cost {cost:>2}: {ms:>9.1f} ms{marker}")
+    if timings.get(rounds, float("inf")) > args.target_ms:
+        print(f"No cost from 10 up verifies within {args.target_ms:.0f} ms; using the floor, {rounds}")
+    print(f"Set BCRYPT_ROUNDS={rounds}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -2,10 +2,12 @@ from fastapi import FastAPI, HTTPException, Depends
 from pydantic import BaseModel
 from typing import List, Annotated
 import models
+import metrics
 from database import engine, SessionLocal
 from sqlalchemy.orm import Session
 
 app = FastAPI()
+metrics.install(app, engines={"primary": engine})
 models.Base.metadata.create_all(bind=engine)
 
 class ChoiceBase(BaseModel):
@@ -1,9 +1,24 @@
+import os
 from flask import Flask, render_template, request, redirect
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 from datetime import datetime, timezone
 
 app = Flask(__name__)
 app.config['SQLALCHEMY_DATABASE_URI'] = "sqlite:///todo.db"
+
+# ---- DATABASE SETTINGS (override with TODO_* environment variables) ----
+# "production" runs the pragmas below on every connection, "off" keeps SQLite defaults
+app.config['SQLITE_PROFILE'] = os.getenv("TODO_SQLITE_PROFILE", "production")
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.getenv("TODO_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+app.config['SQLITE_CACHE_SIZE_KB'] = int(os.getenv("TODO_SQLITE_CACHE_SIZE_KB", "64000"))
+app.config['SQLITE_MMAP_SIZE'] = int(os.getenv("TODO_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Connection pool: persistent connections, extra burst connections, seconds to wait for one
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    "pool_size": int(os.getenv("TODO_DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("TODO_DB_MAX_OVERFLOW", "10")),
+    "pool_timeout": float(os.getenv("TODO_DB_POOL_TIMEOUT", "30")),
+}
 db = SQLAlchemy(app)
 
 
@@ -17,9 +32,36 @@ class Todo(db.Model):
         return f"{self.sno} - {self.title}"
 
 
+# ---- SQLITE PRODUCTION PROFILE ----
+# WAL lets readers and the writer work concurrently; the rest trades
+# per-commit fsyncs and small caches for throughput.
+SQLITE_PRAGMAS = {}
+if app.config['SQLITE_PROFILE'] == "production":
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": app.config['SQLITE_BUSY_TIMEOUT_MS'],
+        "cache_size": -app.config['SQLITE_CACHE_SIZE_KB'],
+        "mmap_size": app.config['SQLITE_MMAP_SIZE'],
+        "temp_store": "MEMORY",
+    }
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
 # ---- CREATE DATABASE AUTOMATICALLY ----
 with app.app_context():
+    if SQLITE_PRAGMAS:
+        event.listen(db.engine, "connect", set_sqlite_pragmas)
     db.create_all()
+    with db.engine.connect() as conn:
+        effective = {name: conn.exec_driver_sql(f"PRAGMA {name}").scalar() for name in SQLITE_PRAGMAS}
+    app.logger.info("SQLite settings in effect: %s; pool %s", effective, app.config['SQLALCHEMY_ENGINE_OPTIONS'])
 # ---------------------------------------
 
 